@@ -8,6 +8,12 @@ import pygame
 from pygame.locals import QUIT, MOUSEBUTTONDOWN, SRCALPHA, KEYDOWN, K_RETURN, K_BACKSPACE, K_TAB, K_ESCAPE  # pylint: disable=no-name-in-module
 import os
 import math
+import queue
+import string
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from chess_logic import ChessGame, Piece, Pawn, Rook, Knight, Bishop, Queen, King # Import your logic
 import stockfish_analysis
 import model_chat
@@ -23,6 +29,7 @@ CHAT_PANEL_WIDTH = 400  # Increased width for better chat experience
 WIDTH = BOARD_SIZE + CHAT_PANEL_WIDTH
 HEIGHT = BOARD_SIZE
 FPS = 30
+IDLE_FPS = 10  # Tick rate while nothing needs redrawing
 
 # Enhanced Colors
 WHITE = (255, 255, 255)
@@ -47,24 +54,71 @@ INPUT_BORDER = (206, 212, 218)  # Input border
 INPUT_FOCUS_BORDER = (0, 123, 255)  # Blue focus border
 TYPING_INDICATOR = (108, 117, 125)  # Gray for typing indicator
 
+# Per-square pixel positions and rects, precomputed once so the hot draw
+# loops do a tuple lookup instead of two multiplies per square.
+SQ_XY = tuple(tuple((c * SQUARE_SIZE, r * SQUARE_SIZE) for c in range(8)) for r in range(8))
+SQ_RECTS = tuple(tuple(pygame.Rect(c * SQUARE_SIZE, r * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+                       for c in range(8)) for r in range(8))
+
+# Screen regions used for partial display updates
+BOARD_AREA_RECT = pygame.Rect(0, 0, BOARD_SIZE, HEIGHT)
+CHAT_PANEL_RECT = pygame.Rect(BOARD_SIZE, 0, CHAT_PANEL_WIDTH, HEIGHT)
+
 # Screen
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Pygame Chess")
 clock = pygame.time.Clock()
 
-# Enhanced Fonts
-FONT_SMALL = pygame.font.SysFont("segoeui", 14)
-FONT = pygame.font.SysFont("segoeui", 16)
-FONT_MEDIUM = pygame.font.SysFont("segoeui", 18)
-LARGE_FONT = pygame.font.SysFont("segoeui", 36, bold=True)
-CHAT_FONT = pygame.font.SysFont("segoeui", 15)
-CHAT_FONT_SMALL = pygame.font.SysFont("segoeui", 13)
+# Only the event types we actually handle; everything else (mouse motion
+# etc.) is dropped at the SDL layer instead of allocating Event objects.
+# set_blocked(None) blocks every type; set_allowed(None) would allow all.
+HANDLED_EVENT_TYPES = [QUIT, MOUSEBUTTONDOWN, KEYDOWN]
+pygame.event.set_blocked(None)
+pygame.event.set_allowed(HANDLED_EVENT_TYPES)
+
+# Enhanced Fonts - resolve the font file once instead of letting SysFont
+# rescan the system font paths for every size.
+_FONT_PATH = pygame.font.match_font("segoeui")  # None falls back to pygame's default font
+
+@lru_cache(maxsize=None)
+def get_font(size, bold=False):
+    font = pygame.font.Font(_FONT_PATH, size)
+    font.set_bold(bold)
+    return font
+
+FONT_SMALL = get_font(14)
+FONT = get_font(16)
+FONT_MEDIUM = get_font(18)
+LARGE_FONT = get_font(36, bold=True)
+CHAT_FONT = get_font(15)
+CHAT_FONT_SMALL = get_font(13)
 
 # --- Load Assets ---
 PIECE_IMAGES = {}
 PROMOTION_PIECE_IMAGES = {} # For promotion dialog
+BOARD_SURFACE = None       # Prerendered board squares (static, drawn once)
+CHAT_HEADER_SURFACE = None # Prerendered chat header gradient (static)
+
+def build_static_surfaces():
+    """Prerender surfaces that never change, so the main loop can blit them
+    instead of re-issuing dozens of draw calls every frame."""
+    global BOARD_SURFACE, CHAT_HEADER_SURFACE
+
+    BOARD_SURFACE = pygame.Surface((BOARD_SIZE, BOARD_SIZE)).convert()
+    for r in range(8):
+        for c in range(8):
+            color = LIGHT_SQUARE if (r + c) % 2 == 0 else DARK_SQUARE
+            pygame.draw.rect(BOARD_SURFACE, color, SQ_RECTS[r][c])
+
+    CHAT_HEADER_SURFACE = pygame.Surface((CHAT_PANEL_WIDTH, 50)).convert()
+    for i in range(50):
+        color_intensity = int(248 - i * 0.2)  # Subtle gradient
+        pygame.draw.line(CHAT_HEADER_SURFACE, (color_intensity, color_intensity + 1, color_intensity + 2),
+                        (0, i), (CHAT_PANEL_WIDTH, i))
 
 def load_assets():
+    build_static_surfaces()
+
     piece_chars = ['P', 'R', 'N', 'B', 'Q', 'K']
     colors = ['w', 'b']
     assets_path = "assets/pieces" # Ensure this path is correct
@@ -75,49 +129,63 @@ def load_assets():
         pygame.quit()  # pylint: disable=no-member
         exit()
 
-    for color in colors:
-        for char in piece_chars:
-            filename = f"{color}{char.upper()}.svg"
-            try:
-                img = pygame.image.load(os.path.join(assets_path, filename)).convert_alpha()
-                PIECE_IMAGES[f"{color}{char.upper()}"] = pygame.transform.smoothscale(img, (SQUARE_SIZE, SQUARE_SIZE))
-                if char in ['Q', 'R', 'B', 'N']: # For promotion dialog
-                     PROMOTION_PIECE_IMAGES[f"{color}{char.upper()}"] = pygame.transform.smoothscale(img, (SQUARE_SIZE // 2, SQUARE_SIZE // 2))
-            except pygame.error as e:  # pylint: disable=no-member
-                print(f"Error loading image {filename}: {e}")
-                print(f"Searched in: {os.path.abspath(os.path.join(assets_path, filename))}")
-                # Create a placeholder if image not found
-                placeholder_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), SRCALPHA)
-                placeholder_surface.fill((255,0,0,100)) # Red semi-transparent
-                pygame.draw.rect(placeholder_surface, BLACK, (0,0,SQUARE_SIZE,SQUARE_SIZE), 2)
-                text_surf = FONT.render(f"{color}{char}", True, BLACK)
-                text_rect = text_surf.get_rect(center=(SQUARE_SIZE//2, SQUARE_SIZE//2))
-                placeholder_surface.blit(text_surf, text_rect)
-                PIECE_IMAGES[f"{color}{char.upper()}"] = placeholder_surface
-                if char in ['Q', 'R', 'B', 'N']:
-                     PROMOTION_PIECE_IMAGES[f"{color}{char.upper()}"] = pygame.transform.smoothscale(placeholder_surface, (SQUARE_SIZE // 2, SQUARE_SIZE // 2))
+    def _load_one(color, char):
+        """Load and scale one piece SVG; returns (key, full_img, promo_img)."""
+        key = f"{color}{char.upper()}"
+        filename = f"{key}.svg"
+        try:
+            img = pygame.image.load(os.path.join(assets_path, filename)).convert_alpha()
+        except pygame.error as e:  # pylint: disable=no-member
+            print(f"Error loading image {filename}: {e}")
+            print(f"Searched in: {os.path.abspath(os.path.join(assets_path, filename))}")
+            # Create a placeholder if image not found
+            img = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), SRCALPHA)
+            img.fill((255,0,0,100)) # Red semi-transparent
+            pygame.draw.rect(img, BLACK, (0,0,SQUARE_SIZE,SQUARE_SIZE), 2)
+            text_surf = FONT.render(f"{color}{char}", True, BLACK)
+            text_rect = text_surf.get_rect(center=(SQUARE_SIZE//2, SQUARE_SIZE//2))
+            img.blit(text_surf, text_rect)
+        # smoothscale can return a non-display-format surface; convert once
+        # here so every later blit stays on the fast same-format path.
+        full_img = pygame.transform.smoothscale(img, (SQUARE_SIZE, SQUARE_SIZE)).convert_alpha()
+        promo_img = None
+        if char in ['Q', 'R', 'B', 'N']: # For promotion dialog
+            promo_img = pygame.transform.smoothscale(img, (SQUARE_SIZE // 2, SQUARE_SIZE // 2)).convert_alpha()
+        return key, full_img, promo_img
+
+    # SVG rasterization dominates startup; the files are independent, so
+    # decode and scale them in parallel.
+    with ThreadPoolExecutor(max_workers=len(colors) * len(piece_chars)) as pool:
+        results = pool.map(lambda args: _load_one(*args),
+                           [(color, char) for color in colors for char in piece_chars])
+    for key, full_img, promo_img in results:
+        PIECE_IMAGES[key] = full_img
+        if promo_img is not None:
+            PROMOTION_PIECE_IMAGES[key] = promo_img
 
 
 # --- Helper Functions for GUI ---
 def draw_board(surface):
-    for r in range(8):
-        for c in range(8):
-            color = LIGHT_SQUARE if (r + c) % 2 == 0 else DARK_SQUARE
-            pygame.draw.rect(surface, color, (c * SQUARE_SIZE, r * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    surface.blit(BOARD_SURFACE, (0, 0))
 
 def draw_pieces(surface, board_state):
-    for r in range(8):
-        for c in range(8):
-            piece = board_state[r][c]
-            if piece:
-                img_key = f"{piece.color.lower()}{piece.symbol_char.upper()}"
-                if img_key in PIECE_IMAGES:
-                    surface.blit(PIECE_IMAGES[img_key], (c * SQUARE_SIZE, r * SQUARE_SIZE))
-                else: # Fallback if image key somehow wrong (shouldn't happen with new Piece init)
-                    text_surf = FONT.render(str(piece), True, BLACK if piece.color == 'W' else WHITE)
-                    text_rect = text_surf.get_rect(center=(c * SQUARE_SIZE + SQUARE_SIZE // 2,
-                                                           r * SQUARE_SIZE + SQUARE_SIZE // 2))
-                    surface.blit(text_surf, text_rect)
+    # Collect all piece blits and issue them in one batched call; fblits
+    # (pygame-ce) skips per-item argument parsing, blits is the fallback.
+    blit_list = []
+    for sq, piece in enumerate(board_state):
+        if piece:
+            r, c = sq >> 3, sq & 7
+            img_key = f"{piece.color.lower()}{piece.symbol_char.upper()}"
+            if img_key in PIECE_IMAGES:
+                blit_list.append((PIECE_IMAGES[img_key], SQ_XY[r][c]))
+            else: # Fallback if image key somehow wrong (shouldn't happen with new Piece init)
+                text_surf = FONT.render(str(piece), True, BLACK if piece.color == 'W' else WHITE)
+                text_rect = text_surf.get_rect(center=(c * SQUARE_SIZE + SQUARE_SIZE // 2,
+                                                       r * SQUARE_SIZE + SQUARE_SIZE // 2))
+                blit_list.append((text_surf, text_rect.topleft))
+    if blit_list:
+        batch_blit = getattr(surface, 'fblits', surface.blits)
+        batch_blit(blit_list)
 
 
 def draw_highlights(surface, selected_sq, legal_targets):
@@ -125,96 +193,124 @@ def draw_highlights(surface, selected_sq, legal_targets):
         r, c = selected_sq
         s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), SRCALPHA)
         s.fill(HIGHLIGHT_COLOR)
-        surface.blit(s, (c * SQUARE_SIZE, r * SQUARE_SIZE))
+        surface.blit(s, SQ_XY[r][c])
 
     for r_target, c_target in legal_targets:
         s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), SRCALPHA)
         s.fill(LEGAL_MOVE_COLOR)
         pygame.draw.circle(s, (0,0,0,150), (SQUARE_SIZE // 2, SQUARE_SIZE // 2), SQUARE_SIZE // 6) # Inner dot
-        surface.blit(s, (c_target * SQUARE_SIZE, r_target * SQUARE_SIZE))
+        surface.blit(s, SQ_XY[r_target][c_target])
+
+# Status strings repeat for many frames; render each unique one only once.
+@lru_cache(maxsize=32)
+def _render_text_cached(font_id, text, color):
+    return _FONTS_BY_ID[font_id].render(text, True, color)
+
+def render_text(font, text, color):
+    _FONTS_BY_ID[id(font)] = font
+    return _render_text_cached(id(font), text, color)
+
+# Fixed geometry of the game-over reset button
+RESET_BUTTON_RECT = pygame.Rect(BOARD_SIZE // 2 - 75, BOARD_SIZE + 30, 150, 30)
 
 def draw_info_panel(surface, game_status, game_over_msg):
     panel_rect = pygame.Rect(0, BOARD_SIZE, BOARD_SIZE, 40)
     pygame.draw.rect(surface, (220, 220, 220), panel_rect) # Light gray background
     pygame.draw.line(surface, BLACK, (0, BOARD_SIZE), (BOARD_SIZE, BOARD_SIZE), 2) # Separator
 
-    y_offset = BOARD_SIZE + 10
-
     if game_over_msg:
-        text_surf = LARGE_FONT.render(game_over_msg, True, (200, 0, 0) if "Checkmate" in game_over_msg else (0,0,200))
+        text_surf = render_text(LARGE_FONT, game_over_msg,
+                                (200, 0, 0) if "Checkmate" in game_over_msg else (0,0,200))
         text_rect = text_surf.get_rect(center=(BOARD_SIZE // 2, BOARD_SIZE + 20))
         surface.blit(text_surf, text_rect)
 
         # Reset button
-        reset_button_rect = pygame.Rect(BOARD_SIZE // 2 - 75, BOARD_SIZE + 30, 150, 30)
-        pygame.draw.rect(surface, (180, 180, 180), reset_button_rect)
-        pygame.draw.rect(surface, BLACK, reset_button_rect, 2)
-        reset_text = FONT.render("New Game", True, BLACK)
-        reset_text_rect = reset_text.get_rect(center=reset_button_rect.center)
+        pygame.draw.rect(surface, (180, 180, 180), RESET_BUTTON_RECT)
+        pygame.draw.rect(surface, BLACK, RESET_BUTTON_RECT, 2)
+        reset_text = render_text(FONT, "New Game", BLACK)
+        reset_text_rect = reset_text.get_rect(center=RESET_BUTTON_RECT.center)
         surface.blit(reset_text, reset_text_rect)
-        return reset_button_rect # Return for click detection
+        return RESET_BUTTON_RECT # Return for click detection
     else:
-        text_surf = FONT.render(game_status, True, BLACK)
+        text_surf = render_text(FONT, game_status, BLACK)
         text_rect = text_surf.get_rect(topleft=(10, BOARD_SIZE + 10))
         surface.blit(text_surf, text_rect)
     return None
 
-def create_rounded_rect_surface(width, height, radius, color, border_color=None, border_width=0):
-    """Create a surface with rounded corners"""
-    surface = pygame.Surface((width, height), SRCALPHA)
-
-    # Main rectangle
-    main_rect = pygame.Rect(radius, radius, width - 2*radius, height - 2*radius)
-    pygame.draw.rect(surface, color, main_rect)
-
-    # Top and bottom rectangles
-    pygame.draw.rect(surface, color, (radius, 0, width - 2*radius, radius))
-    pygame.draw.rect(surface, color, (radius, height - radius, width - 2*radius, radius))
-
-    # Left and right rectangles
-    pygame.draw.rect(surface, color, (0, radius, radius, height - 2*radius))
-    pygame.draw.rect(surface, color, (width - radius, radius, radius, height - 2*radius))
-
-    # Corner circles
-    pygame.draw.circle(surface, color, (radius, radius), radius)
-    pygame.draw.circle(surface, color, (width - radius, radius), radius)
-    pygame.draw.circle(surface, color, (radius, height - radius), radius)
-    pygame.draw.circle(surface, color, (width - radius, height - radius), radius)
-
-    # Border if specified
+def draw_rounded_rect(surface, rect, radius, color, border_color=None, border_width=0):
+    """Draw a rounded rectangle using pygame's native border_radius support."""
+    pygame.draw.rect(surface, color, rect, border_radius=radius)
     if border_color and border_width > 0:
-        # This is a simplified border - for better results, you'd need more complex logic
-        pygame.draw.rect(surface, border_color, (0, 0, width, height), border_width)
+        pygame.draw.rect(surface, border_color, rect, width=border_width, border_radius=radius)
 
-    return surface
+# Fonts looked up by id() so wrapped lines can be memoized on hashable keys.
+_FONTS_BY_ID = {}
+# Per-font glyph advance widths; measuring single glyphs once turns the
+# O(chars^2) font.size(growing_line) pattern into O(chars) dict lookups.
+_ADVANCES_BY_FONT = {}
 
 def wrap_text(text, font, max_width):
-    """Wrap text to fit within max_width"""
-    words = text.split(' ')
-    lines = []
-    current_line = ""
+    """Wrap text to fit within max_width. Results are memoized per
+    (text, font, max_width) since chat messages are immutable."""
+    _FONTS_BY_ID[id(font)] = font
+    return _wrap_text_cached(text, id(font), max_width)
+
+def _glyph_advances(font_id):
+    adv = _ADVANCES_BY_FONT.get(font_id)
+    if adv is None:
+        font = _FONTS_BY_ID[font_id]
+        adv = {ch: font.size(ch)[0] for ch in string.printable}
+        _ADVANCES_BY_FONT[font_id] = adv
+    return adv
+
+@lru_cache(maxsize=512)
+def _wrap_text_cached(text, font_id, max_width):
+    font = _FONTS_BY_ID[font_id]
+    adv = _glyph_advances(font_id)
+    space_width = adv[' ']
+
+    def word_width(word):
+        w = 0
+        for ch in word:
+            cw = adv.get(ch)
+            if cw is None:
+                # Unseen glyph (non-printable/unicode): measure once, remember
+                cw = font.size(ch)[0]
+                adv[ch] = cw
+            w += cw
+        return w
 
-    for word in words:
-        test_line = current_line + word + " " if current_line else word + " "
-        if font.size(test_line)[0] <= max_width:
-            current_line = test_line
+    lines = []
+    current_line = []
+    current_width = 0
+
+    for word in text.split(' '):
+        ww = word_width(word) + space_width
+        if current_width + ww <= max_width:
+            current_line.append(word)
+            current_width += ww
         else:
             if current_line:
-                lines.append(current_line.rstrip())
-                current_line = word + " "
+                lines.append(' '.join(current_line))
+                current_line = [word]
+                current_width = ww
             else:
                 # Word is too long, break it
                 lines.append(word)
-                current_line = ""
+                current_width = 0
 
     if current_line:
-        lines.append(current_line.rstrip())
+        lines.append(' '.join(current_line))
 
-    return lines
+    return tuple(lines)
 
-def draw_message_bubble(surface, message, x, y, max_width, is_user=True):
-    """Draw a modern message bubble"""
-    # Choose colors based on sender
+# Rendered bubble surfaces, keyed by (message, is_user, max_width). Messages
+# are immutable once posted, so entries never need invalidating.
+_BUBBLE_CACHE = {}
+_BUBBLE_CACHE_MAX = 64
+
+def _build_bubble_surface(message, is_user, max_width):
+    """Render a message bubble once; returns the composed Surface."""
     if is_user:
         bg_color = USER_BUBBLE
         text_color = USER_TEXT
@@ -240,16 +336,10 @@ def draw_message_bubble(surface, message, x, y, max_width, is_user=True):
 
     bubble_width = min(max_line_width + 2 * padding, max_width)
 
-    # Position bubble (right-align for user, left-align for bot)
-    if is_user:
-        bubble_x = x + max_width - bubble_width
-    else:
-        bubble_x = x
-
     # Create bubble surface
-    bubble_surface = create_rounded_rect_surface(
-        bubble_width, bubble_height, 16, bg_color, border_color, 1 if border_color else 0
-    )
+    bubble_surface = pygame.Surface((bubble_width, bubble_height), SRCALPHA)
+    draw_rounded_rect(bubble_surface, bubble_surface.get_rect(), 16, bg_color,
+                      border_color, 1 if border_color else 0)
 
     # Add text to bubble
     text_y = padding
@@ -259,50 +349,48 @@ def draw_message_bubble(surface, message, x, y, max_width, is_user=True):
         bubble_surface.blit(text_surf, (text_x, text_y))
         text_y += line_height
 
-    # Draw bubble on main surface
-    surface.blit(bubble_surface, (bubble_x, y))
+    return bubble_surface.convert_alpha()
 
-    return bubble_height + 8  # Return height including margin
-
-def draw_enhanced_chat_panel(surface, chat_messages, input_text, is_typing=False, chat_active=False):
-    """Draw an enhanced, modern chat panel"""
-    panel_rect = pygame.Rect(BOARD_SIZE, 0, CHAT_PANEL_WIDTH, HEIGHT)
+def draw_message_bubble(surface, message, x, y, max_width, is_user=True):
+    """Draw a modern message bubble (rendered once, blitted from cache)"""
+    key = (message, is_user, max_width)
+    bubble_surface = _BUBBLE_CACHE.get(key)
+    if bubble_surface is None:
+        bubble_surface = _build_bubble_surface(message, is_user, max_width)
+        if len(_BUBBLE_CACHE) >= _BUBBLE_CACHE_MAX:
+            _BUBBLE_CACHE.pop(next(iter(_BUBBLE_CACHE)))  # Evict oldest
+        _BUBBLE_CACHE[key] = bubble_surface
+
+    bubble_width = bubble_surface.get_width()
+    bubble_height = bubble_surface.get_height()
 
-    # Main background
-    pygame.draw.rect(surface, CHAT_BG, panel_rect)
+    # Position bubble (right-align for user, left-align for bot)
+    if is_user:
+        bubble_x = x + max_width - bubble_width
+    else:
+        bubble_x = x
 
-    # Left border
-    pygame.draw.line(surface, CHAT_BORDER, (BOARD_SIZE, 0), (BOARD_SIZE, HEIGHT), 2)
+    surface.blit(bubble_surface, (bubble_x, y))
 
-    # Header
-    header_rect = pygame.Rect(BOARD_SIZE, 0, CHAT_PANEL_WIDTH, 50)
-    header_gradient = pygame.Surface((CHAT_PANEL_WIDTH, 50))
-    for i in range(50):
-        color_intensity = int(248 - i * 0.2)  # Subtle gradient
-        pygame.draw.line(header_gradient, (color_intensity, color_intensity + 1, color_intensity + 2),
-                        (0, i), (CHAT_PANEL_WIDTH, i))
-    surface.blit(header_gradient, (BOARD_SIZE, 0))
+    return bubble_height + 8  # Return height including margin
 
-    # Header text
-    header_text = FONT_MEDIUM.render("Chess Assistant", True, (52, 58, 64))
-    header_rect_center = header_text.get_rect(center=(BOARD_SIZE + CHAT_PANEL_WIDTH // 2, 25))
-    surface.blit(header_text, header_rect_center)
+# Last computed chat layout, reused until the recent messages change
+_CHAT_LAYOUT_CACHE = {'key': None, 'visible': []}
 
-    # Header border
-    pygame.draw.line(surface, CHAT_BORDER, (BOARD_SIZE, 50), (BOARD_SIZE + CHAT_PANEL_WIDTH, 50), 1)
+# Rendered input-line surface, reused until the text changes
+_INPUT_SURF_CACHE = {'key': None, 'surf': None}
 
-    # Chat area
-    chat_area_y = 60
-    chat_area_height = HEIGHT - 120  # Space for header and input
-    chat_area_width = CHAT_PANEL_WIDTH - 20
+CARET_BLINK_MS = 500
 
-    # Display messages
-    current_y = chat_area_y + 10  # Start from top with some padding
-    max_bubble_width = chat_area_width - 40
+def caret_visible():
+    return (pygame.time.get_ticks() // CARET_BLINK_MS) % 2 == 0
 
+def _layout_chat_messages(recent_messages, chat_area_y, chat_area_height, max_bubble_width):
+    """Position the recent messages within the chat area. Returns a list of
+    (role, msg, y) tuples in chronological order."""
     # Show recent messages (from oldest to newest, up to what fits)
     visible_messages = []
-    recent_messages = chat_messages[-15:]  # Get last 15 messages
+    current_y = chat_area_y + 10  # Start from top with some padding
 
     for role, msg in recent_messages:
         message_height = len(wrap_text(msg, CHAT_FONT, max_bubble_width - 24)) * CHAT_FONT.get_height() + 32
@@ -330,43 +418,168 @@ def draw_enhanced_chat_panel(surface, chat_messages, input_text, is_typing=False
         # Reverse to get chronological order for drawing
         visible_messages.reverse()
 
+    return visible_messages
+
+# Composed right-panel surface; rebuilt only when the chat state changes,
+# otherwise the whole panel is a single blit.
+_PANEL_CACHE = {'key': None, 'surf': None}
+
+def draw_enhanced_chat_panel(surface, chat_messages, input_text, is_typing=False, chat_active=False):
+    """Draw the chat panel, re-rendering the cached panel surface only when
+    its visible state (messages, input text, focus, caret) has changed."""
+    caret_on = chat_active and caret_visible()
+    key = (tuple(chat_messages[-15:]), input_text, chat_active, caret_on)
+    if _PANEL_CACHE['key'] != key:
+        if _PANEL_CACHE['surf'] is None:
+            _PANEL_CACHE['surf'] = pygame.Surface((CHAT_PANEL_WIDTH, HEIGHT)).convert()
+        _render_chat_panel(_PANEL_CACHE['surf'], chat_messages, input_text, chat_active, caret_on)
+        _PANEL_CACHE['key'] = key
+    surface.blit(_PANEL_CACHE['surf'], (BOARD_SIZE, 0))
+
+def _render_chat_panel(panel, chat_messages, input_text, chat_active, caret_on):
+    """Render the full chat panel into `panel` (panel-local coordinates)."""
+    # Main background
+    panel.fill(CHAT_BG)
+
+    # Left border
+    pygame.draw.line(panel, CHAT_BORDER, (0, 0), (0, HEIGHT), 2)
+
+    # Header (prerendered gradient)
+    panel.blit(CHAT_HEADER_SURFACE, (0, 0))
+
+    # Header text
+    header_text = FONT_MEDIUM.render("Chess Assistant", True, (52, 58, 64))
+    header_rect_center = header_text.get_rect(center=(CHAT_PANEL_WIDTH // 2, 25))
+    panel.blit(header_text, header_rect_center)
+
+    # Header border
+    pygame.draw.line(panel, CHAT_BORDER, (0, 50), (CHAT_PANEL_WIDTH, 50), 1)
+
+    # Chat area
+    chat_area_y = 60
+    chat_area_height = HEIGHT - 120  # Space for header and input
+    chat_area_width = CHAT_PANEL_WIDTH - 20
+    max_bubble_width = chat_area_width - 40
+
+    # Layout only changes when the recent messages change; reuse it otherwise.
+    recent_messages = tuple(chat_messages[-15:])  # Get last 15 messages
+    if _CHAT_LAYOUT_CACHE.get('key') == recent_messages:
+        visible_messages = _CHAT_LAYOUT_CACHE['visible']
+    else:
+        visible_messages = _layout_chat_messages(
+            recent_messages, chat_area_y, chat_area_height, max_bubble_width)
+        _CHAT_LAYOUT_CACHE['key'] = recent_messages
+        _CHAT_LAYOUT_CACHE['visible'] = visible_messages
+
     # Draw messages from top to bottom
     for role, msg, msg_y in visible_messages:
         is_user = role == "user"
-        bubble_height = draw_message_bubble(
-            surface, msg, BOARD_SIZE + 10, msg_y, max_bubble_width, is_user
-        )
+        draw_message_bubble(panel, msg, 10, msg_y, max_bubble_width, is_user)
 
     # Input area
     input_area_y = HEIGHT - 60
-    input_rect = pygame.Rect(BOARD_SIZE + 10, input_area_y, CHAT_PANEL_WIDTH - 20, 40)
+    input_rect = pygame.Rect(10, input_area_y, CHAT_PANEL_WIDTH - 20, 40)
 
     # Input background
     input_border_color = INPUT_FOCUS_BORDER if chat_active else INPUT_BORDER
-    input_surface = create_rounded_rect_surface(
-        input_rect.width, input_rect.height, 8, INPUT_BG, input_border_color, 2
-    )
-    surface.blit(input_surface, input_rect.topleft)
+    draw_rounded_rect(panel, input_rect, 8, INPUT_BG, input_border_color, 2)
 
-    # Input placeholder or text
-    if input_text or is_typing:
-        display_text = input_text + ("|" if is_typing else "")
-        input_surf = CHAT_FONT.render(display_text, True, BOT_TEXT)
-    else:
-        input_surf = CHAT_FONT.render("Ask about the position...", True, TYPING_INDICATOR)
+    # Input placeholder or text (re-rendered only when the text changes)
+    key = (input_text, True) if input_text else ("Ask about the position...", False)
+    if _INPUT_SURF_CACHE.get('key') != key:
+        text, is_real = key
+        _INPUT_SURF_CACHE['key'] = key
+        _INPUT_SURF_CACHE['surf'] = CHAT_FONT.render(text, True, BOT_TEXT if is_real else TYPING_INDICATOR)
+    input_surf = _INPUT_SURF_CACHE['surf']
 
     # Ensure text fits in input box
-    if input_surf.get_width() > input_rect.width - 16:
-        # Scroll text if too long
-        text_surface = pygame.Surface((input_rect.width - 16, input_surf.get_height()), SRCALPHA)
-        text_surface.blit(input_surf, (-(input_surf.get_width() - (input_rect.width - 16)), 0))
-        surface.blit(text_surface, (input_rect.x + 8, input_rect.y + 8))
+    visible_width = input_rect.width - 16
+    if input_surf.get_width() > visible_width:
+        # Scroll text if too long: clip to the box and blit at a negative
+        # offset - SDL handles the clip in C, no scratch surface needed.
+        panel.set_clip(pygame.Rect(input_rect.x + 8, input_rect.y + 8,
+                                   visible_width, input_surf.get_height()))
+        panel.blit(input_surf, (input_rect.x + 8 - (input_surf.get_width() - visible_width),
+                                input_rect.y + 8))
+        panel.set_clip(None)
+        text_end_x = input_rect.x + 8 + visible_width
     else:
-        surface.blit(input_surf, (input_rect.x + 12, input_rect.y + 10))
+        panel.blit(input_surf, (input_rect.x + 12, input_rect.y + 10))
+        text_end_x = input_rect.x + 12 + (input_surf.get_width() if input_text else 0)
+
+    # Time-based caret blink; drawn as a line, no text re-render involved
+    if caret_on:
+        pygame.draw.line(panel, BOT_TEXT,
+                         (text_end_x + 1, input_rect.y + 10),
+                         (text_end_x + 1, input_rect.y + 10 + CHAT_FONT.get_height()), 2)
 
     # Send button hint
     send_hint = CHAT_FONT_SMALL.render("Press Enter to send", True, TYPING_INDICATOR)
-    surface.blit(send_hint, (BOARD_SIZE + 12, HEIGHT - 18))
+    panel.blit(send_hint, (12, HEIGHT - 18))
+
+THINKING_PLACEHOLDER = "Thinking..."
+
+# Sentinel the LLM worker puts on the queue after the last streamed chunk
+_STREAM_DONE = object()
+
+_EMPTY_REPLY_FALLBACK = "I'm analyzing the position. Could you please rephrase your question?"
+
+def _group_moves_by_source(game):
+    """Group the current player's legal moves by source square so repeated
+    piece selections are a dict lookup instead of a full move generation."""
+    grouped = {}
+    for from_sq, to_sq in game.get_all_legal_moves_for_player(game.current_player):
+        grouped.setdefault(from_sq, []).append(to_sq)
+    return grouped
+
+# Stockfish results keyed by FEN so repeat questions about the same
+# position skip the 0.2-0.5 s search entirely.
+_ANALYSIS_CACHE = OrderedDict()
+_ANALYSIS_CACHE_MAX = 256
+
+# Analyses launched ahead of time (while the user is still typing) keyed
+# by FEN; _run_analysis collects them instead of searching again.
+_PENDING_ANALYSIS = {}
+
+def _prefetch_analysis(fen):
+    """Start Stockfish analysis in the background so the 0.2-0.5 s search
+    hides behind the user's typing time instead of the reply latency."""
+    if fen in _ANALYSIS_CACHE or fen in _PENDING_ANALYSIS:
+        return
+    _PENDING_ANALYSIS[fen] = (
+        stockfish_analysis.evaluate_moves_async(fen),
+        stockfish_analysis.get_principal_variations_async(fen),
+    )
+
+def _run_analysis(fen):
+    """Run both Stockfish analyses for a position (called off the GUI thread).
+    Results are cached per FEN."""
+    if fen in _ANALYSIS_CACHE:
+        return _ANALYSIS_CACHE[fen]
+    pending = _PENDING_ANALYSIS.pop(fen, None)
+    try:
+        if pending is not None:
+            best_moves = pending[0].result()
+            pv_lines = pending[1].result()
+        else:
+            best_moves = stockfish_analysis.evaluate_moves(fen)
+            pv_lines = stockfish_analysis.get_principal_variations(fen)
+    except Exception as e:
+        print("Stockfish analysis error:", e)
+        return None, None
+    if len(_ANALYSIS_CACHE) >= _ANALYSIS_CACHE_MAX:
+        _ANALYSIS_CACHE.popitem(last=False)
+    _ANALYSIS_CACHE[fen] = (best_moves, pv_lines)
+    return best_moves, pv_lines
+
+def _compose_stockfish_summary(best_moves, pv_lines):
+    """Condense analysis results into the one-line context string for the LLM."""
+    summary = ""
+    if best_moves:
+        summary += "Best moves: " + ", ".join(f"{san} ({score})" for _, score, san in best_moves[:3])
+    if pv_lines:
+        summary += " | Top lines: " + " | ".join(" ".join(line['pv']) for line in pv_lines[:2])
+    return summary
 
 def get_square_from_mouse(pos):
     x, y = pos
@@ -388,10 +601,8 @@ def display_promotion_dialog(surface, player_color):
     dialog_y = (HEIGHT - dialog_height) / 2
 
     # Background with rounded corners
-    dialog_surface = create_rounded_rect_surface(
-        int(dialog_width), int(dialog_height), 12, PROMOTION_BG_COLOR, PROMOTION_BORDER_COLOR, 3
-    )
-    surface.blit(dialog_surface, (dialog_x, dialog_y))
+    dialog_rect = pygame.Rect(dialog_x, dialog_y, int(dialog_width), int(dialog_height))
+    draw_rounded_rect(surface, dialog_rect, 12, PROMOTION_BG_COLOR, PROMOTION_BORDER_COLOR, 3)
 
     text_surf = FONT.render("Promote to:", True, BLACK)
     surface.blit(text_surf, (dialog_x + 10, dialog_y + 10))
@@ -418,7 +629,7 @@ def display_promotion_dialog(surface, player_color):
 
     # Wait for user choice
     while True:
-        for event in pygame.event.get():
+        for event in pygame.event.get([QUIT, MOUSEBUTTONDOWN]):
             if event.type == QUIT:
                 pygame.quit()  # pylint: disable=no-member
                 exit()
@@ -439,10 +650,7 @@ def main():
 
     selected_piece_pos = None # (r, c) of the selected piece
     legal_move_targets = []   # List of (r, c) for legal moves of selected piece
-
-    # Stockfish analysis results
-    best_moves = None
-    pv_lines = None
+    moves_by_src = None       # Legal moves grouped by source, cached per position
 
     # Chat state
     chat_messages = [
@@ -452,13 +660,35 @@ def main():
     is_typing = False
     chat_active = False
 
+    # Results from background workers, polled each frame. The LLM worker
+    # streams text chunks followed by _STREAM_DONE; the chat message being
+    # answered grows in place as chunks arrive.
+    llm_q = queue.Queue()
+    streaming_idx = None  # Index into chat_messages of the reply being streamed
+
     running = True
+    full_redraw = True   # First frame (and board changes) present the whole screen
+    dirty_rects = []     # Regions to present when only part of the UI changed
+    last_caret_on = caret_visible()
     while running:
+        # Caret blink is the only time-driven repaint, and only while focused
+        caret_on = caret_visible()
+        if chat_active and caret_on != last_caret_on:
+            dirty_rects.append(CHAT_PANEL_RECT)
+        last_caret_on = caret_on
         reset_button_rect = None
-        for event in pygame.event.get():
+        events = pygame.event.get(HANDLED_EVENT_TYPES)
+        for event in events:
             if event.type == QUIT:
                 running = False
 
+            if event.type == MOUSEBUTTONDOWN:
+                # Clicks can change board, info panel and chat focus alike
+                full_redraw = True
+            elif event.type == KEYDOWN:
+                # Typing only touches the chat panel
+                dirty_rects.append(CHAT_PANEL_RECT)
+
             if event.type == MOUSEBUTTONDOWN:
                 if event.button == 1: # Left click
                     mouse_pos = pygame.mouse.get_pos()
@@ -479,6 +709,7 @@ def main():
                                 game = ChessGame() # Reset game
                                 selected_piece_pos = None
                                 legal_move_targets = []
+                                moves_by_src = None
                                 continue # Skip further click processing for this event
 
                         if game.game_over_message: # If game is over, don't process board clicks
@@ -509,58 +740,65 @@ def main():
                                 result = game.process_move(from_sq, to_sq, promotion_choice)
                                 # process_move updates game.status_message and game.game_over_message
 
-                                # After a successful move, run Stockfish analysis
+                                # Stockfish analysis is lazy: it only runs (and
+                                # is cached) when the user asks a question.
                                 if result is True:
-                                    fen = game.get_fen()
-                                    try:
-                                        best_moves = stockfish_analysis.evaluate_moves(fen)
-                                        pv_lines = stockfish_analysis.get_principal_variations(fen)
-                                    except Exception as e:
-                                        best_moves = None
-                                        pv_lines = None
-                                        print("Stockfish analysis error:", e)
+                                    moves_by_src = None # Position changed
 
                                 selected_piece_pos = None # Deselect after move attempt
                                 legal_move_targets = []
 
-                            elif game.get_board_state()[r_clk][c_clk] and \
-                                 game.get_board_state()[r_clk][c_clk].color == game.current_player:
+                            elif game.get_board_state()[r_clk * 8 + c_clk] and \
+                                 game.get_board_state()[r_clk * 8 + c_clk].color == game.current_player:
                                 # Clicked on another of own pieces, select it instead
                                 selected_piece_pos = clicked_sq
-                                piece_obj = game.get_board_state()[r_clk][c_clk]
-                                all_legal_moves = game.get_all_legal_moves_for_player(game.current_player)
-                                legal_move_targets = [m[1] for m in all_legal_moves if m[0] == selected_piece_pos]
+                                if moves_by_src is None:
+                                    moves_by_src = _group_moves_by_source(game)
+                                legal_move_targets = moves_by_src.get(selected_piece_pos, [])
                             else:
                                 # Clicked on empty square or opponent (not a legal move target), deselect
                                 selected_piece_pos = None
                                 legal_move_targets = []
 
                         else: # No piece selected yet
-                            piece_at_click = game.get_board_state()[r_clk][c_clk]
+                            piece_at_click = game.get_board_state()[r_clk * 8 + c_clk]
                             if piece_at_click and piece_at_click.color == game.current_player:
                                 selected_piece_pos = clicked_sq
-                                all_legal_moves = game.get_all_legal_moves_for_player(game.current_player)
-                                legal_move_targets = [m[1] for m in all_legal_moves if m[0] == selected_piece_pos]
+                                if moves_by_src is None:
+                                    moves_by_src = _group_moves_by_source(game)
+                                legal_move_targets = moves_by_src.get(selected_piece_pos, [])
                             else:
                                 selected_piece_pos = None
                                 legal_move_targets = []
 
             if event.type == pygame.KEYDOWN and chat_active:  # pylint: disable=no-member
                 if event.key == pygame.K_RETURN:  # pylint: disable=no-member
-                    if input_text.strip():
-                        chat_messages.append(("user", input_text.strip()))
-                        # Compose Stockfish summary for context
+                    # One reply at a time: a second question while one is
+                    # still streaming would interleave both replies into
+                    # the same bubble. The typed text stays in the input
+                    # until the current reply finishes.
+                    reply_pending = streaming_idx is not None or any(
+                        role == "bot" and msg == THINKING_PLACEHOLDER
+                        for role, msg in chat_messages)
+                    if input_text.strip() and not reply_pending:
+                        question = input_text.strip()
+                        chat_messages.append(("user", question))
+                        chat_messages.append(("bot", THINKING_PLACEHOLDER))
                         fen = game.get_fen()
-                        stockfish_summary = ""
-                        if best_moves:
-                            stockfish_summary += "Best moves: " + ", ".join(f"{san} ({score})" for _, score, san in best_moves[:3])
-                        if pv_lines:
-                            stockfish_summary += " | Top lines: " + " | ".join(" ".join(line['pv']) for line in pv_lines[:2])
-                        try:
-                            llm_response = model_chat.ask_model(input_text.strip(), fen, stockfish_summary)
-                        except Exception as e:
-                            llm_response = f"Error: {e}"
-                        chat_messages.append(("bot", llm_response))
+
+                        # Analysis (FEN-cached) and the LLM round-trip both run
+                        # off the render thread; the answer is streamed onto
+                        # the queue chunk by chunk so it paints as it arrives.
+                        def _ask(question=question, fen=fen):
+                            try:
+                                best_moves, pv_lines = _run_analysis(fen)
+                                summary = _compose_stockfish_summary(best_moves, pv_lines)
+                                for chunk in model_chat.ask_model(question, fen, summary, stream=True):
+                                    llm_q.put(chunk)
+                            except Exception as e:
+                                llm_q.put(f"Error: {e}")
+                            llm_q.put(_STREAM_DONE)
+                        threading.Thread(target=_ask, daemon=True).start()
                         input_text = ""
                 elif event.key == pygame.K_BACKSPACE:  # pylint: disable=no-member
                     input_text = input_text[:-1]
@@ -571,23 +809,61 @@ def main():
                     is_typing = False
                 else:
                     if len(input_text) < 200:
+                        if not input_text:
+                            # First keystroke of a question: warm up the
+                            # engine analysis for the current position.
+                            _prefetch_analysis(game.get_fen())
                         input_text += event.unicode
 
-        # Drawing
-        screen.fill(WHITE) # Fill background for info panel area
-        draw_board(screen)
-        if selected_piece_pos or legal_move_targets: # Only draw if there's something to highlight
-            draw_highlights(screen, selected_piece_pos, legal_move_targets)
-        draw_pieces(screen, game.get_board_state())
-        main.last_reset_button_rect = draw_info_panel(
-            screen,
-            game.status_message,
-            game.game_over_message
-        )
-        draw_enhanced_chat_panel(screen, chat_messages, input_text, is_typing, chat_active)
-
-        pygame.display.flip()
-        clock.tick(FPS)
+        # Collect streamed response chunks; the pending placeholder turns
+        # into the reply text and grows in place as tokens arrive.
+        try:
+            while True:
+                chunk = llm_q.get_nowait()
+                if chunk is _STREAM_DONE:
+                    if streaming_idx is not None and not chat_messages[streaming_idx][1]:
+                        chat_messages[streaming_idx] = ("bot", _EMPTY_REPLY_FALLBACK)
+                    streaming_idx = None
+                    dirty_rects.append(CHAT_PANEL_RECT)
+                    continue
+                if streaming_idx is None:
+                    # First chunk of a reply: claim the oldest placeholder
+                    for i, (role, msg) in enumerate(chat_messages):
+                        if role == "bot" and msg == THINKING_PLACEHOLDER:
+                            streaming_idx = i
+                            chat_messages[i] = ("bot", "")
+                            break
+                if streaming_idx is not None:
+                    _, msg = chat_messages[streaming_idx]
+                    chat_messages[streaming_idx] = ("bot", msg + chunk if msg else chunk.lstrip())
+                    dirty_rects.append(CHAT_PANEL_RECT)
+        except queue.Empty:
+            pass
+
+        # Drawing - only when something changed; otherwise idle cheaply.
+        if full_redraw or dirty_rects:
+            screen.fill(WHITE) # Fill background for info panel area
+            draw_board(screen)
+            if selected_piece_pos or legal_move_targets: # Only draw if there's something to highlight
+                draw_highlights(screen, selected_piece_pos, legal_move_targets)
+            draw_pieces(screen, game.get_board_state())
+            main.last_reset_button_rect = draw_info_panel(
+                screen,
+                game.status_message,
+                game.game_over_message
+            )
+            draw_enhanced_chat_panel(screen, chat_messages, input_text, is_typing, chat_active)
+
+            if full_redraw:
+                pygame.display.flip()
+            else:
+                # Present only the changed regions (e.g. chat panel on typing)
+                pygame.display.update(dirty_rects)
+            full_redraw = False
+            dirty_rects = []
+            clock.tick(FPS)
+        else:
+            clock.tick(IDLE_FPS)
 
     pygame.quit()  # pylint: disable=no-member
 
@@ -1,5 +1,5 @@
 # chess_logic.py
-import copy
+import random
 
 # --- Helper Functions ---
 def to_coords(notation):
@@ -15,12 +15,206 @@ def to_notation(coords):
     if not (0 <= row <= 7 and 0 <= col <= 7): return None
     return chr(ord('a') + col) + str(8 - row)
 
+# --- Bitboard layout ---
+# Squares are numbered 0..63 as r*8+c, matching the board array: square 0 is
+# a8 (row 0, col 0) and square 63 is h1. Each (color, piece-char) pair owns a
+# 64-bit int mask; occupancy masks are kept alongside for fast emptiness and
+# attack tests.
+
+def square_index(r, c):
+    return r * 8 + c
+
+def pack_move(from_idx, to_idx):
+    """Pack a move into one small int (from in bits 0-5, to in bits 6-11):
+    cheaper to hash and compare than a pair of (r, c) tuples."""
+    return from_idx | (to_idx << 6)
+
+# Starting-position masks, indexed by (color, symbol_char)
+START_BITBOARDS = {
+    ('B', 'R'): 0x81,
+    ('B', 'N'): 0x42,
+    ('B', 'B'): 0x24,
+    ('B', 'Q'): 0x08,
+    ('B', 'K'): 0x10,
+    ('B', 'P'): 0xFF << 8,
+    ('W', 'P'): 0xFF << 48,
+    ('W', 'R'): 0x81 << 56,
+    ('W', 'N'): 0x42 << 56,
+    ('W', 'B'): 0x24 << 56,
+    ('W', 'Q'): 0x08 << 56,
+    ('W', 'K'): 0x10 << 56,
+}
+
+# --- Zobrist keys ---
+# One 64-bit key per (color, piece, square), per castling right, per en
+# passant file, plus one for the side to move. Seeded RNG keeps hashes
+# reproducible across runs.
+_ZOB_RNG = random.Random(0x5EED)
+
+ZOB_PIECE = {
+    (color, char): [_ZOB_RNG.getrandbits(64) for _ in range(64)]
+    for color in ('W', 'B') for char in 'PNBRQK'
+}
+ZOB_CASTLING = {
+    (color, side): _ZOB_RNG.getrandbits(64)
+    for color in ('W', 'B') for side in ('K', 'Q')
+}
+ZOB_EP_FILE = [_ZOB_RNG.getrandbits(64) for _ in range(8)]
+ZOB_SIDE = _ZOB_RNG.getrandbits(64)
+
+# --- Precomputed attack tables ---
+# For each square, the bitmask of squares a piece of that type attacks from
+# there, with board-edge filtering baked in at import time.
+
+def _build_step_attacks(offsets):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        mask = 0
+        for dr, dc in offsets:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr <= 7 and 0 <= nc <= 7:
+                mask |= 1 << (nr * 8 + nc)
+        table.append(mask)
+    return table
+
+KNIGHT_OFFSETS = [(2,1),(2,-1),(-2,1),(-2,-1),(1,2),(1,-2),(-1,2),(-1,-2)]
+KING_OFFSETS = [(0,1),(0,-1),(1,0),(-1,0),(1,1),(1,-1),(-1,1),(-1,-1)]
+
+KNIGHT_ATTACKS = _build_step_attacks(KNIGHT_OFFSETS)
+KING_ATTACKS = _build_step_attacks(KING_OFFSETS)
+# White pawns move toward row 0, black toward row 7
+WHITE_PAWN_ATTACKS = _build_step_attacks([(-1,-1),(-1,1)])
+BLACK_PAWN_ATTACKS = _build_step_attacks([(1,-1),(1,1)])
+
+# Sliding rays, one table per direction indexed by square. RAY_MASKS holds
+# the bitmask of the ray, RAY_SQUARES the same squares as ordered (r, c)
+# tuples walking outward from the origin square.
+# Direction ids: 0=N 1=S 2=E 3=W 4=NE 5=NW 6=SE 7=SW ("north" = toward row 0).
+_DIR_OFFSETS = ((-1,0), (1,0), (0,1), (0,-1), (-1,1), (-1,-1), (1,1), (1,-1))
+
+def _build_rays():
+    masks = []
+    squares = []
+    for dr, dc in _DIR_OFFSETS:
+        dir_masks = []
+        dir_squares = []
+        for sq in range(64):
+            r, c = divmod(sq, 8)
+            mask = 0
+            path = []
+            nr, nc = r + dr, c + dc
+            while 0 <= nr <= 7 and 0 <= nc <= 7:
+                mask |= 1 << (nr * 8 + nc)
+                path.append((nr, nc))
+                nr += dr
+                nc += dc
+            dir_masks.append(mask)
+            dir_squares.append(tuple(path))
+        masks.append(dir_masks)
+        squares.append(dir_squares)
+    return masks, squares
+
+RAY_MASKS, RAY_SQUARES = _build_rays()
+
+ROOK_RAY_IDS = (0, 1, 2, 3)
+BISHOP_RAY_IDS = (4, 5, 6, 7)
+QUEEN_RAY_IDS = ROOK_RAY_IDS + BISHOP_RAY_IDS
+
+# Rays whose square indices increase (blocker = lowest set bit) vs decrease
+# (blocker = highest set bit).
+_POSITIVE_RAY_IDS = frozenset((1, 2, 6, 7))
+
+def _ray_attacks(sq, occ, ray_ids):
+    """Attack mask for a slider on sq over the given rays, cut at the first
+    blocker (the blocker square itself stays attackable)."""
+    attacks = 0
+    for d in ray_ids:
+        ray = RAY_MASKS[d][sq]
+        blockers = ray & occ
+        if blockers:
+            if d in _POSITIVE_RAY_IDS:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= RAY_MASKS[d][first]
+        attacks |= ray
+    return attacks
+
+def rook_attacks(sq, occ):
+    return _ray_attacks(sq, occ, ROOK_RAY_IDS)
+
+def bishop_attacks(sq, occ):
+    return _ray_attacks(sq, occ, BISHOP_RAY_IDS)
+
+def queen_attacks(sq, occ):
+    return _ray_attacks(sq, occ, QUEEN_RAY_IDS)
+
+def _sliding_moves(r, c, board_state, color, ray_ids):
+    """Slider move list on an object board: walk each precomputed ray until
+    the first occupied square, no per-step bounds checks."""
+    moves = []
+    sq = r * 8 + c
+    for d in ray_ids:
+        for nr, nc in RAY_SQUARES[d][sq]:
+            target_piece = board_state[nr * 8 + nc]
+            if target_piece is None:
+                moves.append((nr, nc))
+            elif target_piece.color != color:
+                moves.append((nr, nc)); break
+            else:
+                break
+    return moves
+
+# Pawn push/capture generation over whole pawn sets. One shift handles all
+# eight pawns of a color; the file masks strip captures that would wrap
+# around a board edge. "Up" (toward row 0) is a right shift in this layout.
+_FULL_BOARD = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+_NOT_FILE_A = _FULL_BOARD ^ FILE_A
+_NOT_FILE_H = _FULL_BOARD ^ FILE_H
+_ROW_5 = 0xFF << 40  # white single pushes land here before a double push
+_ROW_2 = 0xFF << 16  # black equivalent
+
+def white_pawn_move_bitboards(pawns, empty, capture_targets):
+    """Target masks (single, double, capture-left, capture-right) for all
+    white pawns at once. capture_targets should include the EP square."""
+    single = (pawns >> 8) & empty
+    double = ((single & _ROW_5) >> 8) & empty
+    cap_l = (pawns >> 9) & capture_targets & _NOT_FILE_H
+    cap_r = (pawns >> 7) & capture_targets & _NOT_FILE_A
+    return single, double, cap_l, cap_r
+
+def black_pawn_move_bitboards(pawns, empty, capture_targets):
+    single = ((pawns << 8) & empty) & _FULL_BOARD
+    double = ((single & _ROW_2) << 8) & empty
+    cap_l = ((pawns << 7) & capture_targets & _NOT_FILE_H) & _FULL_BOARD
+    cap_r = ((pawns << 9) & capture_targets & _NOT_FILE_A) & _FULL_BOARD
+    return single, double, cap_l, cap_r
+
+def _mask_to_squares(mask):
+    """Yield (r, c) for each set bit of a bitmask."""
+    while mask:
+        lsb = mask & -mask
+        sq = lsb.bit_length() - 1
+        yield sq >> 3, sq & 7
+        mask &= mask - 1
+
 # --- Piece Classes (Pawn, Rook, Knight, Bishop, Queen, King) ---
+# Integer piece types: comparing `piece.ptype` is much cheaper than the
+# isinstance() MRO walk in the move-generation inner loops.
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+_PTYPE_BY_CHAR = {'P': PAWN, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}
+
 class Piece:
+    __slots__ = ('color', 'symbol_char', 'symbol', 'ptype', 'has_moved')
+
     def __init__(self, color, symbol_char):
         self.color = color
         self.symbol_char = symbol_char
         self.symbol = symbol_char.upper() if color == 'W' else symbol_char.lower()
+        self.ptype = _PTYPE_BY_CHAR[symbol_char]
         self.has_moved = False
 
     def get_image_filename(self):
@@ -37,6 +231,7 @@ class Piece:
         return (nr, nc) in possible_moves
 
 class Pawn(Piece):
+    __slots__ = ()
     def __init__(self, color):
         super().__init__(color, 'P')
 
@@ -44,18 +239,18 @@ class Pawn(Piece):
         moves = []
         direction = -1 if self.color == 'W' else 1
         # Forward moves
-        if 0 <= r + direction <= 7 and board_state[r + direction][c] is None:
+        if 0 <= r + direction <= 7 and board_state[(r + direction) * 8 + c] is None:
             moves.append((r + direction, c))
             # Two squares initial move
             if not self.has_moved and 0 <= r + 2 * direction <= 7 and \
-               board_state[r + 2 * direction][c] is None and \
-               board_state[r + direction][c] is None: # Ensure path is clear
+               board_state[(r + 2 * direction) * 8 + c] is None and \
+               board_state[(r + direction) * 8 + c] is None: # Ensure path is clear
                 moves.append((r + 2 * direction, c))
         # Captures
         for dc in [-1, 1]:
             nr, nc = r + direction, c + dc
             if 0 <= nr <= 7 and 0 <= nc <= 7:
-                target_piece = board_state[nr][nc]
+                target_piece = board_state[nr * 8 + nc]
                 if target_piece and target_piece.color != self.color:
                     moves.append((nr, nc))
                 # En passant
@@ -64,73 +259,48 @@ class Pawn(Piece):
         return moves
 
 class Rook(Piece):
+    __slots__ = ()
     def __init__(self, color):
         super().__init__(color, 'R')
     def get_possible_moves(self, r, c, board_state):
-        moves = []
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-        for dr, dc in directions:
-            for i in range(1, 8):
-                nr, nc = r + dr * i, c + dc * i
-                if not (0 <= nr <= 7 and 0 <= nc <= 7): break
-                target_piece = board_state[nr][nc]
-                if target_piece is None: moves.append((nr, nc))
-                elif target_piece.color != self.color:
-                    moves.append((nr, nc)); break
-                else: break
-        return moves
+        return _sliding_moves(r, c, board_state, self.color, ROOK_RAY_IDS)
 
 class Knight(Piece):
+    __slots__ = ()
     def __init__(self, color):
         super().__init__(color, 'N')
     def get_possible_moves(self, r, c, board_state):
         moves = []
-        knight_moves = [(2,1),(2,-1),(-2,1),(-2,-1),(1,2),(1,-2),(-1,2),(-1,-2)]
-        for dr, dc in knight_moves:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr <= 7 and 0 <= nc <= 7:
-                target_piece = board_state[nr][nc]
-                if target_piece is None or target_piece.color != self.color:
-                    moves.append((nr, nc))
+        for nr, nc in _mask_to_squares(KNIGHT_ATTACKS[r * 8 + c]):
+            target_piece = board_state[nr * 8 + nc]
+            if target_piece is None or target_piece.color != self.color:
+                moves.append((nr, nc))
         return moves
 
 class Bishop(Piece):
+    __slots__ = ()
     def __init__(self, color):
         super().__init__(color, 'B')
     def get_possible_moves(self, r, c, board_state):
-        moves = []
-        directions = [(1,1),(1,-1),(-1,1),(-1,-1)]
-        for dr, dc in directions:
-            for i in range(1, 8):
-                nr, nc = r + dr * i, c + dc * i
-                if not (0 <= nr <= 7 and 0 <= nc <= 7): break
-                target_piece = board_state[nr][nc]
-                if target_piece is None: moves.append((nr, nc))
-                elif target_piece.color != self.color:
-                    moves.append((nr, nc)); break
-                else: break
-        return moves
+        return _sliding_moves(r, c, board_state, self.color, BISHOP_RAY_IDS)
 
 class Queen(Piece):
+    __slots__ = ()
     def __init__(self, color):
         super().__init__(color, 'Q')
     def get_possible_moves(self, r, c, board_state):
-        rook_moves = Rook(self.color).get_possible_moves(r, c, board_state)
-        bishop_moves = Bishop(self.color).get_possible_moves(r, c, board_state)
-        return rook_moves + bishop_moves
+        return _sliding_moves(r, c, board_state, self.color, QUEEN_RAY_IDS)
 
 class King(Piece):
+    __slots__ = ()
     def __init__(self, color):
         super().__init__(color, 'K')
     def get_possible_moves(self, r, c, board_state, game_context=None): # game_context for castling
         moves = []
-        king_moves = [(0,1),(0,-1),(1,0),(-1,0),(1,1),(1,-1),(-1,1),(-1,-1)]
-        for dr, dc in king_moves:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr <= 7 and 0 <= nc <= 7:
-                target_piece = board_state[nr][nc]
-                if target_piece is None or target_piece.color != self.color:
-                    moves.append((nr, nc))
+        for nr, nc in _mask_to_squares(KING_ATTACKS[r * 8 + c]):
+            target_piece = board_state[nr * 8 + nc]
+            if target_piece is None or target_piece.color != self.color:
+                moves.append((nr, nc))
         # Castling moves
         if game_context and not self.has_moved: # Check if game_context is provided
             if game_context.can_castle(self.color, 'K', board_state, check_intermediate_squares_attack=False): # Initial check
@@ -139,82 +309,198 @@ class King(Piece):
                 moves.append((r, c - 2))
         return moves
 
+_PIECE_CLASS_BY_CHAR = {'P': Pawn, 'N': Knight, 'B': Bishop, 'R': Rook, 'Q': Queen, 'K': King}
+
+# FEN symbol per (color, ptype): uppercase for white, lowercase for black.
+PIECE_CHAR = {(color, ptype): (char.upper() if color == 'W' else char.lower())
+              for char, ptype in _PTYPE_BY_CHAR.items()
+              for color in ('W', 'B')}
+
 # --- Board Class ---
 class Board:
     def __init__(self):
-        self.board = [[None for _ in range(8)] for _ in range(8)]
+        # Flat 64-square mailbox, indexed r * 8 + c (square 0 = a8).
+        self.board = [None] * 64
+        # Bitboard mirror of the object board: per-(color, piece) masks plus
+        # occupancy, kept in sync by setup_pieces/make_move.
+        self.bb = {key: 0 for key in START_BITBOARDS}
+        self.occ_w = 0
+        self.occ_b = 0
+        self.occ = 0
+        # Square indices holding each color's pieces, so move generation
+        # iterates ~16 entries instead of sweeping all 64 slots.
+        self.piece_squares = {'W': set(), 'B': set()}
         self.setup_pieces()
         self.move_history = [] # For undo, not strictly needed for FEN but good practice
 
+    def _bb_set(self, piece, r, c):
+        mask = 1 << (r * 8 + c)
+        key = (piece.color, piece.symbol_char)
+        self.bb[key] = self.bb.get(key, 0) | mask
+        self.piece_squares[piece.color].add(r * 8 + c)
+        if piece.color == 'W':
+            self.occ_w |= mask
+        else:
+            self.occ_b |= mask
+        self.occ |= mask
+
+    def _bb_clear(self, piece, r, c):
+        mask = 1 << (r * 8 + c)
+        key = (piece.color, piece.symbol_char)
+        self.bb[key] &= ~mask
+        self.piece_squares[piece.color].discard(r * 8 + c)
+        if piece.color == 'W':
+            self.occ_w &= ~mask
+        else:
+            self.occ_b &= ~mask
+        self.occ = self.occ_w | self.occ_b
+
     def setup_pieces(self):
-        # Pawns
-        for i in range(8): self.board[1][i] = Pawn('B'); self.board[6][i] = Pawn('W')
-        # Rooks, Knights, Bishops, Queens, Kings
-        back_rank_pieces = [Rook, Knight, Bishop, Queen, King, Bishop, Knight, Rook]
-        for i, piece_class in enumerate(back_rank_pieces):
-            self.board[0][i] = piece_class('B')
-            self.board[7][i] = piece_class('W')
+        # Everything derives from the literal starting masks: the mailbox is
+        # filled by popping bits, and bitboards/occupancy/piece sets are
+        # straight assignments. Pieces stay distinct objects because
+        # has_moved is per-piece state.
+        board = [None] * 64
+        for (color, char), mask in START_BITBOARDS.items():
+            piece_class = _PIECE_CLASS_BY_CHAR[char]
+            while mask:
+                lsb = mask & -mask
+                board[lsb.bit_length() - 1] = piece_class(color)
+                mask ^= lsb
+        self.board = board
+        self.bb = dict(START_BITBOARDS)
+        self.occ_b = 0xFFFF
+        self.occ_w = 0xFFFF << 48
+        self.occ = self.occ_b | self.occ_w
+        self.piece_squares = {'B': set(range(16)), 'W': set(range(48, 64))}
 
     def get_piece(self, r, c):
-        if 0 <= r <= 7 and 0 <= c <= 7: return self.board[r][c]
+        if 0 <= r <= 7 and 0 <= c <= 7: return self.board[r * 8 + c]
         return None
 
     def make_move(self, from_sq, to_sq, promotion_choice_char=None):
         r1, c1 = from_sq; r2, c2 = to_sq
-        piece = self.board[r1][c1]
+        piece = self.board[r1 * 8 + c1]
         if not piece: return None, False, False # captured_piece, is_castling, is_ep
 
-        captured_piece = self.board[r2][c2]
-        is_pawn_move = isinstance(piece, Pawn)
+        captured_piece = self.board[r2 * 8 + c2]
+        is_pawn_move = piece.ptype == PAWN
         is_capture = captured_piece is not None
         is_castling_move = False
         is_en_passant_capture = False
 
         # Special King move: Castling
-        if isinstance(piece, King) and abs(c2 - c1) == 2:
+        if piece.ptype == KING and abs(c2 - c1) == 2:
             is_castling_move = True
             rook_c1_orig = 0 if c2 < c1 else 7
             rook_c2_new = c1 + (1 if c2 > c1 else -1) # Rook's new column
-            rook = self.board[r1][rook_c1_orig]
-            self.board[r1][rook_c2_new] = rook
-            self.board[r1][rook_c1_orig] = None
-            if rook: rook.has_moved = True
+            rook = self.board[r1 * 8 + rook_c1_orig]
+            self.board[r1 * 8 + rook_c2_new] = rook
+            self.board[r1 * 8 + rook_c1_orig] = None
+            if rook:
+                rook.has_moved = True
+                self._bb_clear(rook, r1, rook_c1_orig)
+                self._bb_set(rook, r1, rook_c2_new)
         # Special Pawn move: En Passant
-        elif isinstance(piece, Pawn) and abs(c2 - c1) == 1 and self.board[r2][c2] is None:
+        elif piece.ptype == PAWN and abs(c2 - c1) == 1 and self.board[r2 * 8 + c2] is None:
             # This implies en passant if it's a diagonal pawn move to an empty square
             # The actual en_passant_target check is done in ChessGame.process_move
             # Here, we identify the captured pawn for removal.
             captured_pawn_r, captured_pawn_c = r1, c2 # Opponent pawn is on same rank as moving pawn, target column
-            captured_piece = self.board[captured_pawn_r][captured_pawn_c] # This will be the captured pawn
-            self.board[captured_pawn_r][captured_pawn_c] = None
+            captured_piece = self.board[captured_pawn_r * 8 + captured_pawn_c] # This will be the captured pawn
+            self.board[captured_pawn_r * 8 + captured_pawn_c] = None
+            if captured_piece:
+                self._bb_clear(captured_piece, captured_pawn_r, captured_pawn_c)
             is_en_passant_capture = True
             is_capture = True # En passant is a capture
 
         # Standard move
-        self.board[r2][c2] = piece
-        self.board[r1][c1] = None
+        if is_capture and not is_en_passant_capture:
+            self._bb_clear(captured_piece, r2, c2)
+        self.board[r2 * 8 + c2] = piece
+        self.board[r1 * 8 + c1] = None
+        self._bb_clear(piece, r1, c1)
 
         # Pawn Promotion
-        if isinstance(piece, Pawn):
+        if piece.ptype == PAWN:
             if (piece.color == 'W' and r2 == 0) or (piece.color == 'B' and r2 == 7):
                 promo_map = {'Q': Queen, 'R': Rook, 'B': Bishop, 'N': Knight}
                 new_piece_class = promo_map.get(str(promotion_choice_char).upper(), Queen) # Default to Queen
                 promoted_piece = new_piece_class(piece.color)
                 promoted_piece.has_moved = True # Promoted piece counts as moved
-                self.board[r2][c2] = promoted_piece
+                self.board[r2 * 8 + c2] = promoted_piece
                 piece = promoted_piece # update piece reference
 
+        self._bb_set(piece, r2, c2)
+
         # Record move for history (optional, but good)
         self.move_history.append({
             'piece': piece, 'from': (r1,c1), 'to': (r2,c2),
             'captured': captured_piece, 'was_castling': is_castling_move,
-            'was_ep': is_en_passant_capture, 'promoted_to': piece.symbol_char if isinstance(piece, Pawn) and promotion_choice_char else None,
+            'was_ep': is_en_passant_capture, 'promoted_to': piece.symbol_char if piece.ptype == PAWN and promotion_choice_char else None,
             'piece_had_moved': piece.has_moved # before this move (for undo)
         })
 
         piece.has_moved = True
         return captured_piece, is_pawn_move, is_capture or is_en_passant_capture
 
+    def make_move_fast(self, from_sq, to_sq, is_castling=False, is_en_passant=False):
+        """Apply a move in place just far enough for a check test. Returns an
+        undo record for unmake_move. has_moved flags, promotion and move
+        history are deliberately untouched - none of them affect whether the
+        mover's own king is attacked."""
+        r1, c1 = from_sq; r2, c2 = to_sq
+        piece = self.board[r1 * 8 + c1]
+        captured_piece = self.board[r2 * 8 + c2]
+        rook_move = None
+        ep_square = None
+
+        if is_castling:
+            rook_c1 = 0 if c2 < c1 else 7
+            rook_c2 = c1 + (1 if c2 > c1 else -1)
+            rook = self.board[r1 * 8 + rook_c1]
+            self.board[r1 * 8 + rook_c2] = rook
+            self.board[r1 * 8 + rook_c1] = None
+            self._bb_clear(rook, r1, rook_c1)
+            self._bb_set(rook, r1, rook_c2)
+            rook_move = (rook, rook_c1, rook_c2)
+        elif is_en_passant:
+            captured_piece = self.board[r1 * 8 + c2]
+            self.board[r1 * 8 + c2] = None
+            self._bb_clear(captured_piece, r1, c2)
+            ep_square = (r1, c2)
+        elif captured_piece is not None:
+            self._bb_clear(captured_piece, r2, c2)
+
+        self.board[r2 * 8 + c2] = piece
+        self.board[r1 * 8 + c1] = None
+        self._bb_clear(piece, r1, c1)
+        self._bb_set(piece, r2, c2)
+
+        return (piece, from_sq, to_sq, captured_piece, rook_move, ep_square)
+
+    def unmake_move(self, undo):
+        """Revert a make_move_fast application."""
+        piece, (r1, c1), (r2, c2), captured_piece, rook_move, ep_square = undo
+        self._bb_clear(piece, r2, c2)
+        self._bb_set(piece, r1, c1)
+        self.board[r1 * 8 + c1] = piece
+        self.board[r2 * 8 + c2] = None
+        if rook_move:
+            rook, rook_c1, rook_c2 = rook_move
+            self.board[r1 * 8 + rook_c1] = rook
+            self.board[r1 * 8 + rook_c2] = None
+            self._bb_clear(rook, r1, rook_c2)
+            self._bb_set(rook, r1, rook_c1)
+        if captured_piece is not None:
+            if ep_square:
+                er, ec = ep_square
+                self.board[er * 8 + ec] = captured_piece
+                self._bb_set(captured_piece, er, ec)
+            else:
+                self.board[r2 * 8 + c2] = captured_piece
+                self._bb_set(captured_piece, r2, c2)
+
 
 # --- Game Logic (ChessGame class) ---
 class ChessGame:
@@ -227,54 +513,95 @@ class ChessGame:
         self.fullmove_number = 1 # Starts at 1, increments after Black's move
         self.status_message = "White's turn."
         self.game_over_message = None
+        # King squares, kept current by process_move; saves the 64-square
+        # find_king scan on every check test against the live board.
+        self.king_pos = {'W': (7, 4), 'B': (0, 4)}
+        self.zobrist = self._compute_zobrist()
+        # Most recent legal-move computation, keyed (zobrist, color). The
+        # hash changes on every move, so stale entries can never be served.
+        self._legal_cache = None
 
     def switch_player(self):
         if self.current_player == 'B':
             self.fullmove_number += 1
         self.current_player = 'B' if self.current_player == 'W' else 'W'
 
+    def _compute_zobrist(self):
+        # Full-board scan; only used at init/reset. During play the hash is
+        # updated incrementally in process_move.
+        h = 0
+        for sq, piece in enumerate(self.board_obj.board):
+            if piece:
+                h ^= ZOB_PIECE[(piece.color, piece.symbol_char)][sq]
+        for color in ('W', 'B'):
+            for side in ('K', 'Q'):
+                if self.castling_rights[color][side]:
+                    h ^= ZOB_CASTLING[(color, side)]
+        if self.en_passant_target:
+            h ^= ZOB_EP_FILE[self.en_passant_target[1]]
+        if self.current_player == 'B':
+            h ^= ZOB_SIDE
+        return h
+
     def find_king(self, color, board_state=None):
-        b = board_state if board_state is not None else self.board_obj.board
-        for r in range(8):
-            for c in range(8):
-                piece = b[r][c]
-                if isinstance(piece, King) and piece.color == color:
-                    return (r, c)
+        # The live board answers from the cache; only detached simulation
+        # boards still need the scan.
+        if board_state is None or board_state is self.board_obj.board:
+            return self.king_pos[color]
+        b = board_state
+        for sq, piece in enumerate(b):
+            if piece and piece.ptype == KING and piece.color == color:
+                return (sq >> 3, sq & 7)
         return None
 
     def is_square_attacked(self, r_target, c_target, attacker_color, board_state=None):
-        b = board_state if board_state is not None else self.board_obj.board
-        for r_idx in range(8):
-            for c_idx in range(8):
-                piece = b[r_idx][c_idx]
-                if piece and piece.color == attacker_color:
-                    # For pawn attacks, their get_possible_moves includes non-capturing forward moves.
-                    # We need to check only their capture capabilities.
-                    if isinstance(piece, Pawn):
-                        direction = -1 if piece.color == 'W' else 1
-                        if r_idx + direction == r_target:
-                            if c_idx + 1 == c_target or c_idx - 1 == c_target:
-                                return True
-                    # For other pieces, use their standard move generation logic
-                    # but we must be careful: is_valid_move checks against full possible_moves.
-                    # We need a version of get_possible_moves that doesn't consider game_context for king (to avoid recursion in check checks for castling)
-                    # and that strictly returns squares they *can* move to (attack or empty).
-                    else:
-                        # Simulate piece.is_valid_move without the king's castling part if it causes issues
-                        # A simpler way: generate raw attack moves
-                        raw_moves = []
-                        if isinstance(piece, King): # King attacks adjacent squares
-                            king_moves = [(0,1),(0,-1),(1,0),(-1,0),(1,1),(1,-1),(-1,1),(-1,-1)]
-                            for dr_k, dc_k in king_moves:
-                                nr_k, nc_k = r_idx + dr_k, c_idx + dc_k
-                                if nr_k == r_target and nc_k == c_target: raw_moves.append((nr_k, nc_k))
-                        elif isinstance(piece, Pawn): # Already handled above
-                            pass
-                        else: # For Rook, Knight, Bishop, Queen
-                             raw_moves = piece.get_possible_moves(r_idx, c_idx, b)
-
-                        if (r_target, c_target) in raw_moves:
-                            return True
+        board = self.board_obj
+        if board_state is None or board_state is board.board:
+            # Live board: invert the question and intersect the target's
+            # attack masks with the attacker's piece bitboards - a handful of
+            # AND tests instead of a 64-square sweep. make_move_fast keeps
+            # the bitboards in sync, so this also covers simulated moves.
+            sq = r_target * 8 + c_target
+            bbd = board.bb
+            if KNIGHT_ATTACKS[sq] & bbd[(attacker_color, 'N')]:
+                return True
+            if KING_ATTACKS[sq] & bbd[(attacker_color, 'K')]:
+                return True
+            # Attacking pawns sit on the squares an opposite-color pawn on
+            # sq would capture to, hence the swapped table.
+            pawn_from = BLACK_PAWN_ATTACKS if attacker_color == 'W' else WHITE_PAWN_ATTACKS
+            if pawn_from[sq] & bbd[(attacker_color, 'P')]:
+                return True
+            occ = board.occ
+            queens = bbd[(attacker_color, 'Q')]
+            straight = bbd[(attacker_color, 'R')] | queens
+            if straight and rook_attacks(sq, occ) & straight:
+                return True
+            diagonal = bbd[(attacker_color, 'B')] | queens
+            if diagonal and bishop_attacks(sq, occ) & diagonal:
+                return True
+            return False
+
+        # Detached simulation boards have no bitboards; scan the mailbox.
+        b = board_state
+        target_bit = 1 << (r_target * 8 + c_target)
+        pawn_attacks = WHITE_PAWN_ATTACKS if attacker_color == 'W' else BLACK_PAWN_ATTACKS
+        for sq, piece in enumerate(b):
+            if piece and piece.color == attacker_color:
+                # Pawn/knight/king attacks come straight from the
+                # precomputed tables; only captures count for pawns.
+                if piece.ptype == PAWN:
+                    if pawn_attacks[sq] & target_bit:
+                        return True
+                elif piece.ptype == KNIGHT:
+                    if KNIGHT_ATTACKS[sq] & target_bit:
+                        return True
+                elif piece.ptype == KING:
+                    if KING_ATTACKS[sq] & target_bit:
+                        return True
+                else: # For Rook, Bishop, Queen
+                    if (r_target, c_target) in piece.get_possible_moves(sq >> 3, sq & 7, b):
+                        return True
         return False
 
     def is_in_check(self, color, board_state=None):
@@ -292,76 +619,176 @@ class ChessGame:
         b = board_state if board_state is not None else self.board_obj.board
         current_en_passant_target = self.en_passant_target if board_state is None else None # Only use game's EP target for current board
 
-        moves = []
-        for r in range(8):
-            for c in range(8):
-                piece = b[r][c]
-                if piece and piece.color == color:
-                    piece_moves = []
-                    if isinstance(piece, Pawn):
-                        piece_moves = piece.get_possible_moves(r, c, b, current_en_passant_target)
-                    elif isinstance(piece, King):
-                        # Pass self (ChessGame instance) as game_context if checking current board
-                        game_ctx = self if board_state is None and check_castling_rights_in_king else None
-                        piece_moves = piece.get_possible_moves(r, c, b, game_context=game_ctx)
+        # Hot loop: walk only the squares known to hold this color's pieces.
+        # Moves are yielded rather than collected so the legal-move filter
+        # can consume them without an intermediate list of tuples. The
+        # piece-square set is snapshotted because the consumer simulates
+        # moves (mutating it) between resumptions. Detached board copies
+        # have no piece_squares, so they keep the scan.
+        bulk_pawns = False
+        if board_state is None:
+            board = self.board_obj
+            occupied = tuple(board.piece_squares[color])
+            # All pawns at once: a handful of 64-bit shifts instead of a
+            # Python call per pawn. Sources are recovered from the fixed
+            # target-to-source offset of each move category.
+            bulk_pawns = True
+            empty = _FULL_BOARD ^ board.occ
+            enemy_occ = board.occ_b if color == 'W' else board.occ_w
+            ep_bb = 0
+            if current_en_passant_target:
+                ep_r, ep_c = current_en_passant_target
+                ep_bb = 1 << (ep_r * 8 + ep_c)
+            if color == 'W':
+                gen = white_pawn_move_bitboards(board.bb[('W', 'P')], empty, enemy_occ | ep_bb)
+                offsets = (8, 16, 9, 7)
+            else:
+                gen = black_pawn_move_bitboards(board.bb[('B', 'P')], empty, enemy_occ | ep_bb)
+                offsets = (-8, -16, -7, -9)
+            for targets, offset in zip(gen, offsets):
+                while targets:
+                    lsb = targets & -targets
+                    t = lsb.bit_length() - 1
+                    s = t + offset
+                    yield ((s >> 3, s & 7), (t >> 3, t & 7))
+                    targets ^= lsb
+        else:
+            occupied = [sq for sq, p in enumerate(b) if p and p.color == color]
+        for sq in occupied:
+            piece = b[sq]
+            r, c = sq >> 3, sq & 7
+            if piece.ptype == PAWN:
+                if bulk_pawns:
+                    continue
+                piece_moves = piece.get_possible_moves(r, c, b, current_en_passant_target)
+            elif piece.ptype == KING:
+                # Pass self (ChessGame instance) as game_context if checking current board
+                game_ctx = self if board_state is None and check_castling_rights_in_king else None
+                piece_moves = piece.get_possible_moves(r, c, b, game_context=game_ctx)
+            else:
+                piece_moves = piece.get_possible_moves(r, c, b)
+
+            from_sq = (r, c)
+            for move in piece_moves:
+                yield (from_sq, move)
+
+    def _compute_check_info(self, color):
+        """Compute, from the bitboards, the pieces giving check and the
+        absolutely pinned pieces for `color` on the live board.
+
+        Returns (checkers_mask, pinned_mask, pin_rays) where pin_rays maps a
+        pinned piece's square index to the mask of squares it may still move
+        to (along the pin ray, up to and including the pinning slider)."""
+        board = self.board_obj
+        bbd = board.bb
+        occ = board.occ
+        own_occ = board.occ_w if color == 'W' else board.occ_b
+        enemy = 'B' if color == 'W' else 'W'
+
+        king_bb = bbd[(color, 'K')]
+        if not king_bb:
+            return 0, 0, {}
+        ksq = king_bb.bit_length() - 1
+
+        checkers = KNIGHT_ATTACKS[ksq] & bbd[(enemy, 'N')]
+        # Enemy pawns attacking ksq sit on the squares our own pawns would
+        # attack from ksq, i.e. the opposite color's attack table.
+        if enemy == 'W':
+            checkers |= BLACK_PAWN_ATTACKS[ksq] & bbd[('W', 'P')]
+        else:
+            checkers |= WHITE_PAWN_ATTACKS[ksq] & bbd[('B', 'P')]
+
+        rooks_queens = bbd[(enemy, 'R')] | bbd[(enemy, 'Q')]
+        bishops_queens = bbd[(enemy, 'B')] | bbd[(enemy, 'Q')]
+
+        pinned = 0
+        pin_rays = {}
+        for d in QUEEN_RAY_IDS:
+            sliders = rooks_queens if d in ROOK_RAY_IDS else bishops_queens
+            if not sliders:
+                continue
+            ray = RAY_MASKS[d][ksq]
+            blockers = ray & occ
+            if not blockers:
+                continue
+            if d in _POSITIVE_RAY_IDS:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            first_bit = 1 << first
+            if first_bit & sliders:
+                checkers |= first_bit
+            elif first_bit & own_occ:
+                rest = blockers ^ first_bit
+                if rest:
+                    if d in _POSITIVE_RAY_IDS:
+                        second = (rest & -rest).bit_length() - 1
                     else:
-                        piece_moves = piece.get_possible_moves(r, c, b)
-
-                    for move in piece_moves:
-                        moves.append(((r,c), move))
-        return moves
+                        second = rest.bit_length() - 1
+                    if (1 << second) & sliders:
+                        pinned |= first_bit
+                        # Squares between king and pinner, pinner included
+                        pin_rays[first] = RAY_MASKS[d][ksq] ^ RAY_MASKS[d][second]
+        return checkers, pinned, pin_rays
 
     def get_all_legal_moves_for_player(self, color):
+        cached = self._legal_cache
+        if cached is not None and cached[0] == self.zobrist and cached[1] == color:
+            return cached[2]
         legal_moves = []
+        board = self.board_obj
+        b = board.board
+        opponent_color = 'B' if color == 'W' else 'W'
+        own_king_pos = self.king_pos[color]
+        checkers, pinned, pin_rays = self._compute_check_info(color)
         # Get raw possible moves, including special moves like castling if conditions are met initially
         possible_raw_moves = self.get_all_possible_moves_for_player(color, check_castling_rights_in_king=True)
 
         for from_sq, to_sq in possible_raw_moves:
-            # Simulate the move on a temporary board
-            # Create a deep copy of the board state for simulation
-            # Using copy.deepcopy on the board_obj.board (list of lists of Pieces)
-            # is safer than trying to manage a temporary Board object's full state (like move history).
-
-            original_board_pieces = [[self.board_obj.board[r][c] for c in range(8)] for r in range(8)]
-            sim_board_state = copy.deepcopy(original_board_pieces)
-
-            piece_to_move_sim = sim_board_state[from_sq[0]][from_sq[1]]
-            if not piece_to_move_sim: continue # Should not happen
-
-            # Handle castling simulation: king and rook move
-            is_castling_attempt = False
-            if isinstance(piece_to_move_sim, King) and abs(to_sq[1] - from_sq[1]) == 2:
-                is_castling_attempt = True
-                # Check if castling is actually valid through non-attacked squares
-                # The can_castle method needs to be called with check_intermediate_squares_attack=True
+            piece = b[from_sq[0] * 8 + from_sq[1]]
+            if not piece: continue # Should not happen
+
+            # A pinned piece can only ever move along its pin ray; anything
+            # else is illegal without needing a simulation.
+            from_idx = from_sq[0] * 8 + from_sq[1]
+            if pinned >> from_idx & 1 and piece.ptype != KING:
+                if not pin_rays[from_idx] >> (to_sq[0] * 8 + to_sq[1]) & 1:
+                    continue
+
+            # Castling legality includes the traversed squares, checked up front
+            is_castling = piece.ptype == KING and abs(to_sq[1] - from_sq[1]) == 2
+            if is_castling:
                 side = 'K' if to_sq[1] > from_sq[1] else 'Q'
-                if not self.can_castle(color, side, self.board_obj.board, check_intermediate_squares_attack=True):
+                if not self.can_castle(color, side, b, check_intermediate_squares_attack=True):
                     continue # This castling path is not safe, so it's not a legal move.
 
-                # Simulate rook move for castling
-                rook_c1_orig = 0 if to_sq[1] < from_sq[1] else 7
-                rook_c2_new = from_sq[1] + (1 if to_sq[1] > from_sq[1] else -1)
-                sim_rook = sim_board_state[from_sq[0]][rook_c1_orig]
-                sim_board_state[from_sq[0]][rook_c2_new] = sim_rook
-                sim_board_state[from_sq[0]][rook_c1_orig] = None
-
-
-            # Handle en passant capture simulation
-            if isinstance(piece_to_move_sim, Pawn) and \
-               to_sq == self.en_passant_target and \
-               abs(to_sq[1] - from_sq[1]) == 1 and \
-               sim_board_state[to_sq[0]][to_sq[1]] is None: # Target square must be empty for EP
-                ep_capture_r = from_sq[0] # Pawn captured is on the same rank as the moving pawn's start
-                ep_capture_c = to_sq[1]   # Pawn captured is in the same column as the EP target square
-                sim_board_state[ep_capture_r][ep_capture_c] = None
-
-            # Simulate the main piece move
-            sim_board_state[to_sq[0]][to_sq[1]] = piece_to_move_sim
-            sim_board_state[from_sq[0]][from_sq[1]] = None
-
-            # Check if the king of 'color' is in check on this simulated board
-            if not self.is_in_check(color, sim_board_state):
+            is_en_passant = piece.ptype == PAWN and \
+                to_sq == self.en_passant_target and \
+                abs(to_sq[1] - from_sq[1]) == 1 and \
+                b[to_sq[0] * 8 + to_sq[1]] is None # Target square must be empty for EP
+
+            # Out of check, only king moves, en passant (discovered-check
+            # edge case) and pinned pieces can expose the king - and pinned
+            # moves already passed the pin-ray filter above. Everything else
+            # is legal without simulation.
+            if not checkers and piece.ptype != KING and not is_en_passant:
                 legal_moves.append((from_sq, to_sq))
+                continue
+
+            # Apply the move in place, test for self-check, revert. No board
+            # copies - make/undo touches only the affected squares. The king
+            # square is known without a scan: it is to_sq for king moves and
+            # the cached position otherwise.
+            undo = board.make_move_fast(from_sq, to_sq, is_castling, is_en_passant)
+            kr, kc = to_sq if piece.ptype == KING else own_king_pos
+            in_check = self.is_square_attacked(kr, kc, opponent_color, b)
+            board.unmake_move(undo)
+
+            if not in_check:
+                legal_moves.append((from_sq, to_sq))
+        packed = frozenset(pack_move(f[0] * 8 + f[1], t[0] * 8 + t[1])
+                           for f, t in legal_moves)
+        self._legal_cache = (self.zobrist, color, legal_moves, packed)
         return legal_moves
 
 
@@ -370,10 +797,10 @@ class ChessGame:
         color = piece_moved.color
         r, c = from_sq
 
-        if isinstance(piece_moved, King):
+        if piece_moved.ptype == KING:
             self.castling_rights[color]['K'] = False
             self.castling_rights[color]['Q'] = False
-        elif isinstance(piece_moved, Rook):
+        elif piece_moved.ptype == ROOK:
             original_king_side_rook_col = 7
             original_queen_side_rook_col = 0
             original_rook_row = 7 if color == 'W' else 0
@@ -385,7 +812,7 @@ class ChessGame:
                     self.castling_rights[color]['K'] = False
 
         # If a rook is captured, update opponent's castling rights
-        if captured_piece_at_to_sq_original_pos and isinstance(captured_piece_at_to_sq_original_pos, Rook):
+        if captured_piece_at_to_sq_original_pos and captured_piece_at_to_sq_original_pos.ptype == ROOK:
             cap_color = captured_piece_at_to_sq_original_pos.color
             cap_r, cap_c = to_sq_for_capture # The square where the rook was captured
 
@@ -407,8 +834,8 @@ class ChessGame:
         king_r = 7 if color == 'W' else 0
         king_c = 4 # Standard king column
 
-        king = board_state[king_r][king_c]
-        if not isinstance(king, King) or king.has_moved or king.color != color:
+        king = board_state[king_r * 8 + king_c]
+        if not king or king.ptype != KING or king.has_moved or king.color != color:
             return False # King has moved or is not the right king
 
         path_squares_to_check_empty = []
@@ -432,13 +859,13 @@ class ChessGame:
             return False # Invalid side
 
         # Check if rook is in place and hasn't moved
-        rook = board_state[king_r][rook_c_orig]
-        if not isinstance(rook, Rook) or rook.has_moved or rook.color != color:
+        rook = board_state[king_r * 8 + rook_c_orig]
+        if not rook or rook.ptype != ROOK or rook.has_moved or rook.color != color:
             return False
 
         # Check path empty
         for r_path, c_path in path_squares_to_check_empty:
-            if board_state[r_path][c_path] is not None:
+            if board_state[r_path * 8 + c_path] is not None:
                 return False
 
         # Check if squares king passes through are attacked
@@ -461,15 +888,15 @@ class ChessGame:
             self.status_message = "Invalid selection or not your turn."
             return False
 
-        legal_moves = self.get_all_legal_moves_for_player(self.current_player)
-        if (from_sq, to_sq) not in legal_moves:
+        self.get_all_legal_moves_for_player(self.current_player) # Ensure cache is fresh
+        if pack_move(r1 * 8 + c1, r2 * 8 + c2) not in self._legal_cache[3]:
             self.status_message = "Illegal move."
             if self.is_in_check(self.current_player, self.board_obj.board):
                  self.status_message += f" {self.current_player} is in check!"
             return False
 
         is_promotion = False
-        if isinstance(piece, Pawn) and \
+        if piece.ptype == PAWN and \
            ((piece.color == 'W' and r2 == 0) or (piece.color == 'B' and r2 == 7)):
             is_promotion = True
             if not promotion_choice_char:
@@ -488,8 +915,17 @@ class ChessGame:
 
         original_piece_at_to_sq = self.board_obj.get_piece(r2, c2) # For castling rights update if rook captured
 
+        # Snapshot state the incremental zobrist update needs to diff against.
+        old_rights = [(color, side) for color in ('W', 'B') for side in ('K', 'Q')
+                      if self.castling_rights[color][side]]
+        old_ep_target = self.en_passant_target
+        is_castling = piece.ptype == KING and abs(c2 - c1) == 2
+
         captured_piece, is_pawn_move, is_capture = self.board_obj.make_move(from_sq, to_sq, promotion_choice_char)
 
+        if piece.ptype == KING:
+            self.king_pos[piece.color] = to_sq
+
         # --- Update Game State AFTER move is made ---
         # 1. Halfmove clock
         if is_pawn_move or is_capture:
@@ -503,13 +939,43 @@ class ChessGame:
 
         # 3. En passant target for *opponent's next turn*
         self.en_passant_target = None # Clear previous EP target by default
-        if isinstance(self.board_obj.get_piece(r2,c2), Pawn) and abs(r1 - r2) == 2:
+        moved_piece = self.board_obj.get_piece(r2, c2)
+        if moved_piece.ptype == PAWN and abs(r1 - r2) == 2:
             self.en_passant_target = ((r1 + r2) // 2, c1) # Square *behind* the pawn
 
         # 4. Switch player (this also updates fullmove_number)
         self.switch_player()
 
-        # 5. Check game end conditions for the NEW current player
+        # 5. Incremental zobrist update (piece moved, capture, castling rook,
+        # rights/EP deltas, side to move). `piece` is the pre-move object, so
+        # its symbol_char is still 'P' even when the move promoted.
+        h = self.zobrist
+        h ^= ZOB_PIECE[(piece.color, piece.symbol_char)][r1 * 8 + c1]
+        final_piece = self.board_obj.get_piece(r2, c2)
+        h ^= ZOB_PIECE[(final_piece.color, final_piece.symbol_char)][r2 * 8 + c2]
+        if captured_piece:
+            if original_piece_at_to_sq is None:  # en passant: victim sat beside us
+                h ^= ZOB_PIECE[(captured_piece.color, 'P')][r1 * 8 + c2]
+            else:
+                h ^= ZOB_PIECE[(captured_piece.color, captured_piece.symbol_char)][r2 * 8 + c2]
+        if is_castling:
+            rook_from_c = 0 if c2 < c1 else 7
+            rook_to_c = c1 - 1 if c2 < c1 else c1 + 1
+            h ^= ZOB_PIECE[(piece.color, 'R')][r1 * 8 + rook_from_c]
+            h ^= ZOB_PIECE[(piece.color, 'R')][r1 * 8 + rook_to_c]
+        new_rights = [(color, side) for color in ('W', 'B') for side in ('K', 'Q')
+                      if self.castling_rights[color][side]]
+        for key in old_rights:
+            if key not in new_rights:
+                h ^= ZOB_CASTLING[key]
+        if old_ep_target:
+            h ^= ZOB_EP_FILE[old_ep_target[1]]
+        if self.en_passant_target:
+            h ^= ZOB_EP_FILE[self.en_passant_target[1]]
+        h ^= ZOB_SIDE
+        self.zobrist = h
+
+        # 6. Check game end conditions for the NEW current player
         new_player_in_check = self.is_in_check(self.current_player, self.board_obj.board)
         new_player_legal_moves = self.get_all_legal_moves_for_player(self.current_player)
 
@@ -532,7 +998,7 @@ class ChessGame:
 
     def needs_promotion(self, from_sq, to_sq):
         piece = self.board_obj.get_piece(from_sq[0], from_sq[1])
-        if not isinstance(piece, Pawn): return False
+        if not piece or piece.ptype != PAWN: return False
         return (piece.color == 'W' and to_sq[0] == 0) or \
                (piece.color == 'B' and to_sq[0] == 7)
 
@@ -543,23 +1009,25 @@ class ChessGame:
         self.__init__()
 
     def get_fen(self):
+        board = self.board_obj.board
+        # 1. Piece placement: collect rank chars in a list and join once,
+        # reading symbols from the precomputed (color, ptype) table.
         fen_parts = []
-        # 1. Piece placement
-        for r in range(8):
+        for row_start in range(0, 64, 8):
+            rank_chars = []
             empty_count = 0
-            rank_str = ""
-            for c in range(8):
-                piece = self.board_obj.board[r][c]
-                if piece:
-                    if empty_count > 0:
-                        rank_str += str(empty_count)
-                        empty_count = 0
-                    rank_str += piece.symbol
-                else:
+            for sq in range(row_start, row_start + 8):
+                piece = board[sq]
+                if piece is None:
                     empty_count += 1
-            if empty_count > 0:
-                rank_str += str(empty_count)
-            fen_parts.append(rank_str)
+                else:
+                    if empty_count:
+                        rank_chars.append(str(empty_count))
+                        empty_count = 0
+                    rank_chars.append(PIECE_CHAR[(piece.color, piece.ptype)])
+            if empty_count:
+                rank_chars.append(str(empty_count))
+            fen_parts.append("".join(rank_chars))
         piece_placement = "/".join(fen_parts)
 
         # 2. Active color
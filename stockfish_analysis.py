@@ -1,49 +1,184 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import chess
 import chess.engine
 
+# One long-lived Stockfish process shared by all calls: spawning a fresh
+# engine costs a fork plus the UCI handshake (~100 ms), which dwarfs the
+# short analyses this module runs.
+_ENGINE = None
+_ENGINE_PATH = None
+_ENGINE_LOCK = threading.Lock()
+
+# The shared SimpleEngine runs one search at a time: a second analyse()
+# arriving mid-search cancels the first, which surfaces as a
+# CancelledError in the caller. Every search takes this lock so
+# concurrent callers queue up instead (_ENGINE_LOCK only guards spawn).
+_SEARCH_LOCK = threading.Lock()
+
+def _get_engine(stockfish_path="stockfish"):
+    """Return the shared engine, spawning it on first use (or when a
+    different binary path is requested)."""
+    global _ENGINE, _ENGINE_PATH
+    with _ENGINE_LOCK:
+        if _ENGINE is None or _ENGINE_PATH != stockfish_path:
+            if _ENGINE is not None:
+                _ENGINE.quit()
+            _ENGINE = chess.engine.SimpleEngine.popen_uci(stockfish_path)
+            # Let Stockfish's internal Lazy SMP use the machine: one search
+            # over all cores beats any Python-level serial loop. A time
+            # budget therefore buys correspondingly deeper search.
+            _ENGINE.configure({
+                "Threads": max(1, (os.cpu_count() or 2) - 1),
+                "Hash": 512
+            })
+            _ENGINE_PATH = stockfish_path
+        return _ENGINE
+
+def _shutdown_engine():
+    if _ENGINE is not None:
+        try:
+            _ENGINE.quit()
+        except chess.engine.EngineError:
+            pass # Already gone
+
+atexit.register(_shutdown_engine)
+
+# Stockfish runs out-of-process, so a small pool lets callers start a
+# search early (e.g. while the user is still typing a question) and
+# collect the result later without holding the GIL.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+@lru_cache(maxsize=512)
+def _evaluate_moves_cached(fen, stockfish_path, analysis_time):
+    board = chess.Board(fen)
+    engine = _get_engine(stockfish_path)
+    # Materialize the legal moves once: every fresh iteration of
+    # board.legal_moves re-runs pseudo-legal generation plus king-safety
+    # filtering, and .count() is itself a full enumeration.
+    legal_moves = list(board.legal_moves)
+    if not legal_moves:
+        return []
+    # Snapshot the side to move up front so the sort below cannot be
+    # affected by any board mutation between here and there.
+    turn = board.turn
+    # One MultiPV root search ranks every legal move in a single analysis
+    # budget, instead of a separate engine round-trip per move.
+    with _SEARCH_LOCK:
+        infos = engine.analyse(
+            board,
+            chess.engine.Limit(time=analysis_time),
+            multipv=len(legal_moves)
+        )
+    move_scores = []
+    for info in infos:
+        move = info["pv"][0]
+        # Use centipawn score (score relative to the side to move)
+        score = info["score"].white().score(mate_score=100000)
+        move_scores.append((move.uci(), score, board.san(move)))
+    # Sort: higher score is better for the side to move
+    move_scores.sort(key=lambda x: x[1], reverse=(turn == chess.WHITE))
+    return move_scores
+
 def evaluate_moves(fen, stockfish_path="stockfish", analysis_time=0.2):
     """
     For the given FEN, evaluate all legal moves using Stockfish.
     Returns a list of (move_uci, score_cp, san) sorted best to worst.
+    Results are memoized by position, so re-asking about the same FEN
+    (hints, explanations) skips the search entirely.
     """
+    return _evaluate_moves_cached(fen, stockfish_path, analysis_time)
+
+evaluate_moves.cache_clear = _evaluate_moves_cached.cache_clear
+
+@lru_cache(maxsize=512)
+def _evaluate_move_cached(fen, move_uci, stockfish_path, analysis_time):
     board = chess.Board(fen)
-    with chess.engine.SimpleEngine.popen_uci(stockfish_path) as engine:
-        move_scores = []
-        for move in board.legal_moves:
-            san = board.san(move)
-            board.push(move)
-            info = engine.analyse(board, chess.engine.Limit(time=analysis_time))
-            # Use centipawn score (score relative to the side to move)
-            score = info["score"].white().score(mate_score=100000)
-            move_scores.append((move.uci(), score, san))
-            board.pop()
-        # Sort: higher score is better for the side to move
-        move_scores.sort(key=lambda x: x[1], reverse=(board.turn == chess.WHITE))
-        return move_scores
+    engine = _get_engine(stockfish_path)
+    move = chess.Move.from_uci(move_uci)
+    # root_moves restricts the search to this one move (UCI `searchmoves`)
+    # without pushing/popping the board in Python, and the shared engine
+    # keeps its transposition table warm between calls from the same
+    # position, so sibling moves reuse each other's subtree work.
+    with _SEARCH_LOCK:
+        info = engine.analyse(
+            board,
+            chess.engine.Limit(time=analysis_time),
+            root_moves=[move]
+        )
+    score = info["score"].white().score(mate_score=100000)
+    return (move_uci, score, board.san(move))
 
-def get_principal_variations(fen, stockfish_path="stockfish", depth=5, multipv=5, analysis_time=0.5):
+def evaluate_move(fen, move_uci, stockfish_path="stockfish", analysis_time=0.2):
     """
-    For the given FEN, get the top principal variations (lines) up to the given depth.
-    Returns a list of dicts: { 'pv': [move1, move2, ...], 'score': cp }
+    Evaluate a single legal move in the given FEN via a searchmoves-
+    restricted search. Returns (move_uci, score_cp, san). Cheaper than
+    evaluate_moves when only one candidate is in question.
     """
+    return _evaluate_move_cached(fen, move_uci, stockfish_path, analysis_time)
+
+evaluate_move.cache_clear = _evaluate_move_cached.cache_clear
+
+def evaluate_moves_async(fen, **kwargs):
+    """Submit evaluate_moves to the shared pool and return a Future.
+    Lets the caller overlap the search with other work and call
+    .result() only when the scores are actually needed."""
+    return _EXECUTOR.submit(evaluate_moves, fen, **kwargs)
+
+def get_principal_variations_async(fen, **kwargs):
+    """Async counterpart of get_principal_variations; returns a Future."""
+    return _EXECUTOR.submit(get_principal_variations, fen, **kwargs)
+
+def prime_position(fen, stockfish_path="stockfish"):
+    """Run a depth-1 search for the position so the engine's transposition
+    table already holds its subtree when a real analysis follows. The
+    shared engine is never asked to clear its hash, so evaluate_moves and
+    get_principal_variations on the same FEN reuse each other's work."""
+    engine = _get_engine(stockfish_path)
+    with _SEARCH_LOCK:
+        engine.analyse(chess.Board(fen), chess.engine.Limit(depth=1))
+
+@lru_cache(maxsize=512)
+def _principal_variations_cached(fen, stockfish_path, depth, multipv):
     board = chess.Board(fen)
-    with chess.engine.SimpleEngine.popen_uci(stockfish_path) as engine:
+    engine = _get_engine(stockfish_path)
+    # Depth-only limit: with multithreaded search the old time cap made the
+    # reached depth vary by machine; a fixed depth is deterministic.
+    with _SEARCH_LOCK:
         infos = engine.analyse(
             board,
-            chess.engine.Limit(depth=depth, time=analysis_time),
+            chess.engine.Limit(depth=depth),
             multipv=multipv
         )
-        lines = []
-        for info in infos:
-            # To get correct SAN, push moves in order on a copy of the board
-            pv_moves = []
-            pv_board = board.copy()
-            for m in info["pv"]:
-                san = pv_board.san(m)
-                pv_moves.append(san)
-                pv_board.push(m)
-            score = info["score"].white().score(mate_score=100000)
-            lines.append({"pv": pv_moves, "score": score})
-        # Sort by score
-        lines.sort(key=lambda x: x["score"], reverse=(board.turn == chess.WHITE))
-        return lines
+    lines = []
+    for info in infos:
+        # SAN re-enumerates legal moves at every ply for disambiguation;
+        # UCI is a constant-time rendering, so the PV is returned as UCI
+        # and SAN is computed only for the first move (the one a UI shows
+        # prominently), which needs no board copy.
+        pv = info["pv"]
+        pv_moves = [m.uci() for m in pv]
+        score = info["score"].white().score(mate_score=100000)
+        lines.append({
+            "pv": pv_moves,
+            "score": score,
+            "san": board.san(pv[0]) if pv else None
+        })
+    # Sort by score
+    lines.sort(key=lambda x: x["score"], reverse=(board.turn == chess.WHITE))
+    return lines
+
+def get_principal_variations(fen, stockfish_path="stockfish", depth=5, multipv=5, analysis_time=0.5):
+    """
+    For the given FEN, get the top principal variations (lines) up to the given depth.
+    Returns a list of dicts: { 'pv': [uci1, uci2, ...], 'score': cp, 'san': first_move_san }
+    Memoized by (fen, depth, multipv); analysis_time is kept for caller
+    compatibility but the search is depth-limited.
+    """
+    return _principal_variations_cached(fen, stockfish_path, depth, multipv)
+
+get_principal_variations.cache_clear = _principal_variations_cached.cache_clear